@@ -0,0 +1,42 @@
+# admin_router.py
+
+import os
+import secrets
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+
+from dependencies import recommender_holder
+
+router = APIRouter()
+
+# 관리자 API 토큰 (설정하지 않으면 관리자 API는 항상 거부됨)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+
+def verify_admin_token(x_admin_token: str | None = Header(default=None)):
+    if not ADMIN_TOKEN or not x_admin_token or not secrets.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="관리자 권한이 없습니다.")
+
+
+# 1. 현재 모델 상태
+@router.get("/model", dependencies=[Depends(verify_admin_token)])
+def read_model_status():
+    return recommender_holder.status()
+
+
+# 2. 모델 재로드 (백그라운드에서 새 모델을 만든 뒤 교체, 요청은 바로 반환)
+#    force=true면 원본 CSV가 그대로여도 모델을 다시 학습
+@router.post("/model/reload", status_code=status.HTTP_202_ACCEPTED, dependencies=[Depends(verify_admin_token)])
+def reload_model(force: bool = False):
+    if not recommender_holder.reload_in_background(force_rebuild=force):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="이미 모델을 다시 불러오는 중입니다.")
+    return recommender_holder.status()
+
+
+# 3. 신작 증분 추가 (NEW_TITLES_CSV의 신작만 기존 모델에 추가한 뒤 교체, 요청은 바로 반환)
+@router.post("/catalog/add", status_code=status.HTTP_202_ACCEPTED, dependencies=[Depends(verify_admin_token)])
+def add_new_titles():
+    if not recommender_holder.current.is_loaded:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="모델이 아직 로드되지 않았습니다.")
+    if not recommender_holder.add_titles_in_background():
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="이미 모델을 다시 불러오는 중입니다.")
+    return recommender_holder.status()
@@ -1,43 +1,57 @@
 # anime_router.py (수정본)
 
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import List, Literal
 import schemas # 👈 1. schemas import (List[schemas.Anime] 때문)
 
 # 👈 2. recommender 모듈과 의존성 함수 import
 from recommender import RecommenderService
 from dependencies import get_recommender_service
 import crud
-from sqlalchemy.orm import Session
-from db import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from db import get_async_db
 
 # 3. '@app' 대신 '@router'를 사용하기 위해 APIRouter 생성
 router = APIRouter()
 
 
+async def attach_favorites_counts(db: AsyncSession, animes_list: list):
+    # 목록에 있는 애니들의 즐겨찾기 수를 한 번의 쿼리로 조회해서 채움
+    counts = await crud.get_favorites_counts_by_anime_ids(
+        db, anime_ids=[anime_dict.get("anime_id") for anime_dict in animes_list]
+    )
+    for anime_dict in animes_list:
+        anime_dict["favorites_count"] = counts.get(anime_dict.get("anime_id"), 0)
+    return animes_list
+
+
 # ---------------------------------------------
 # 1. 모든 애니 목록 (페이지네이션)
 # ---------------------------------------------
+# ids를 주면 해당 애니들만 요청한 순서대로 반환 (GET /animes?ids=1&ids=5, 없는 id는 빠짐)
+# genre(여러 개면 모두 포함), min_score/max_score로 거르고 sort(score, popularity, favorites)로 정렬
+#   예) GET /animes?genre=Action&genre=Comedy&min_score=8&sort=popularity&skip=40&limit=20
 @router.get("/", response_model=List[schemas.Anime])
-def read_animes(
-    skip: int = 0,
-    limit: int = 20,
+async def read_animes(
+    skip: int = Query(default=0, ge=0),
+    limit: int = Query(default=20, ge=1, le=500),
+    ids: List[int] | None = Query(default=None, max_length=100),
+    genre: List[str] | None = Query(default=None, max_length=10),
+    min_score: float | None = Query(default=None, ge=0, le=10),
+    max_score: float | None = Query(default=None, ge=0, le=10),
+    sort: Literal["score", "popularity", "favorites"] | None = None,
     # 'Depends'를 통해 초기화된 추천기 객체를 받음
     recommender: RecommenderService = Depends(get_recommender_service),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    if not recommender.is_loaded:
-        raise HTTPException(status_code=503, detail="모델이 아직 로드 중입니다.")
-    animes_list = recommender.get_all_animes(skip=skip, limit=limit)
-    for anime_dict in animes_list:
-        anime_id = anime_dict.get("anime_id") # 각 애니의 ID를 얻음
-        
-        # crud.py의 함수를 호출하여 DB에서 카운트 조회
-        count = crud.get_favorites_count_by_anime_id(db, anime_id=anime_id)
-        
-        # 딕셔너리에 'favorites_count' 키로 카운트 값 추가
-        anime_dict["favorites_count"] = count
-    return animes_list
+    if ids:
+        animes_list = recommender.get_animes_by_ids(ids)
+    else:
+        animes_list = recommender.get_all_animes(
+            skip=skip, limit=limit, genres=genre, min_score=min_score, max_score=max_score, sort=sort
+        )
+
+    return await attach_favorites_counts(db, animes_list)
 
 
 # ---------------------------------------------
@@ -50,9 +64,6 @@ async def recommend_anime(
     # 🌟 (오류 수정: 'recommender_service' -> 'recommender' 객체 받기)
     recommender: RecommenderService = Depends(get_recommender_service)
 ):
-    if not recommender.is_loaded: 
-        raise HTTPException(status_code=503, detail="서버가 초기화 중이거나 데이터 로딩에 실패했습니다.")
-
     # 🌟 (오류 수정: 'recommender_service' -> 'recommender' 사용)
     recommended_data = await recommender.get_enriched_recommendations(title=title)
     
@@ -63,6 +74,22 @@ async def recommend_anime(
     return {"recommendations": recommended_data}
 
 
+# ---------------------------------------------
+# 2-1. 여러 제목을 한 번에 추천 (배치)
+# ---------------------------------------------
+@router.post("/recommend/batch")
+def recommend_anime_batch(
+    request: schemas.RecommendBatchRequest,
+    recommender: RecommenderService = Depends(get_recommender_service)
+):
+    if not request.titles and not request.anime_ids:
+        raise HTTPException(status_code=400, detail="titles 또는 anime_ids 중 하나는 입력해야 합니다.")
+
+    return recommender.get_batch_recommendations(
+        titles=request.titles, anime_ids=request.anime_ids, top_n=request.top_n
+    )
+
+
 # ---------------------------------------------
 # 3. 검색 시스템
 # ---------------------------------------------
@@ -73,9 +100,6 @@ def search_anime(
     # 🌟 (오류 수정: 'recommender_service' -> 'recommender' 객체 받기)
     recommender: RecommenderService = Depends(get_recommender_service)
 ):
-    if not recommender.is_loaded: 
-        raise HTTPException(status_code=503, detail="서버가 초기화 중이거나 데이터 로딩에 실패했습니다.")
-
     # 🌟 (오류 수정: 'recommender_service' -> 'recommender' 사용)
     matching_titles = recommender.search_anime_titles(keyword=keyword)
     
@@ -83,4 +107,35 @@ def search_anime(
         raise HTTPException(status_code=404, detail=f"'{keyword}' 키워드로 검색된 제목이 없습니다.")
 
     # (팁: schemas.py에 응답 모델을 정의하면 더 좋습니다)
-    return {"titles": matching_titles}
\ No newline at end of file
+    return {"titles": matching_titles}
+
+
+# ---------------------------------------------
+# 4. 자동완성 (검색창 입력 중 호출)
+# ---------------------------------------------
+# 키 입력마다 호출되므로 스레드풀을 거치지 않도록 async로 두고, 결과가 없어도 404 대신 빈 리스트를 반환
+@router.get("/autocomplete")
+async def autocomplete_anime(
+    q: str = Query(default="", max_length=100),
+    limit: int = Query(default=10, ge=1, le=20),
+    recommender: RecommenderService = Depends(get_recommender_service)
+):
+    return {"suggestions": recommender.autocomplete(q, limit=limit)}
+
+
+# ---------------------------------------------
+# 5. 애니 상세 정보
+# ---------------------------------------------
+# 경로 변수 하나짜리라 /recommend, /search 같은 고정 경로를 가리지 않도록 맨 마지막에 선언
+@router.get("/{anime_id}", response_model=schemas.AnimeDetail)
+async def read_anime(
+    anime_id: int,
+    recommender: RecommenderService = Depends(get_recommender_service),
+    db: AsyncSession = Depends(get_async_db)
+):
+    anime = recommender.get_anime_by_id(anime_id)
+    if anime is None:
+        raise HTTPException(status_code=404, detail=f"anime_id {anime_id}에 해당하는 애니메이션이 없습니다.")
+
+    (anime,) = await attach_favorites_counts(db, [anime])
+    return anime
@@ -1,17 +1,17 @@
 import os
 from datetime import datetime, timedelta, timezone
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 import crud
-from db import get_db
+import password_hashing
+from db import get_async_db
 # auth.py
 
-# 1. 암호화 방식 설정 (bcrypt 사용)
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# 1. 암호화 방식 설정 (bcrypt 사용, cost는 BCRYPT_ROUNDS - password_hashing.py 참고)
+pwd_context = password_hashing.pwd_context
 
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
@@ -19,17 +19,15 @@ ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="users/login")
 
-# 2. 비밀번호 검증 함수 (로그인 시 사용)
+# 2. 비밀번호 검증 함수 (동기 버전, API에서는 password_hashing.verify_and_update 사용)
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """입력된 비밀번호와 DB의 해시된 비밀번호를 비교합니다."""
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_hashing.verify_password_sync(plain_password, hashed_password)
 
-# 3. 비밀번호 해시(암호화) 함수 (회원가입 시 사용)
+# 3. 비밀번호 해시(암호화) 함수 (동기 버전, API에서는 password_hashing.hash_password 사용)
 def get_password_hash(password: str) -> str:
     """입력된 비밀번호를 bcrypt 해시로 변환합니다."""
-    if len(password.encode("utf-8")) > 72:
-        password = password.encode("utf-8")[:72].decode("utf-8", errors="ignore")
-    return pwd_context.hash(password)
+    return password_hashing.hash_password_sync(password)
 
 # 4. JWT 토큰 생성 함수
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
@@ -54,14 +52,15 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     return encoded_jwt
 
 # 5. 토큰 검사 및 사용자 반환
-def get_current_user(
+async def get_current_user(
     token: str = Depends(oauth2_scheme), 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     1. 요청 헤더에서 Bearer 토큰을 가져옵니다.
     2. 토큰을 검증(decode)합니다.
-    3. 토큰의 'sub' (이메일) 값으로 DB에서 사용자를 찾아 반환합니다.
+    3. 토큰의 'sub' (이메일) 값으로 사용자를 찾아 반환합니다.
+       (짧게 캐시된 사용자 정보(schemas.User)를 먼저 보고, 없을 때만 DB 조회 - crud.principal_cache)
     """
     
     # 토큰 검증 실패 시 사용할 예외
@@ -84,8 +83,8 @@ def get_current_user(
         # 3. 토큰 디코딩 실패 시 (위조, 만료 등)
         raise credentials_exception
         
-    # 4. 이메일로 DB에서 사용자 조회
-    user = crud.get_user_by_email(db, email=email)
+    # 4. 이메일로 사용자 조회 (캐시 → DB)
+    user = await crud.get_principal_by_email(db, email=email)
     
     if user is None:
         # 5. 토큰은 유효하지만, 그 사이 사용자가 DB에서 삭제된 경우
@@ -0,0 +1,72 @@
+# bench_login.py
+#
+# 로그인(bcrypt 검증) 처리량 벤치마크입니다. DB 없이 password_hashing의 프로세스 풀만 사용합니다.
+#   python bench_login.py                      # BCRYPT_ROUNDS, 워커 수는 환경 변수/기본값
+#   python bench_login.py --rounds 10 12 --workers 1 4 --seconds 5
+#
+# 출력: cost와 워커 수별 초당 로그인 수, 코어당 초당 로그인 수(워커 수와 CPU 코어 수 중 작은 값 기준), p50/p99 지연 시간
+
+import os
+import time
+import asyncio
+import argparse
+import importlib
+
+
+async def _bench(password_hashing, seconds: float, concurrency: int):
+    hashed = await password_hashing.hash_password("benchmark-password")
+    latencies = []
+    deadline = time.perf_counter() + seconds
+
+    async def _client():
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            verified, _ = await password_hashing.verify_and_update("benchmark-password", hashed)
+            assert verified
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(_client() for _ in range(concurrency)))
+    return len(latencies), time.perf_counter() - started, sorted(latencies)
+
+
+def run(rounds: int, workers: int, seconds: float):
+    # 설정은 import 시점에 환경 변수로 읽으므로, 조합마다 환경 변수를 바꾸고 모듈을 다시 로드
+    os.environ.update(
+        BCRYPT_ROUNDS=str(rounds),
+        PASSWORD_HASH_WORKERS=str(workers),
+        PASSWORD_HASH_MAX_PENDING=str(workers * 2),
+    )
+    import password_hashing
+    password_hashing = importlib.reload(password_hashing)
+    try:
+        count, elapsed, latencies = asyncio.run(_bench(password_hashing, seconds, concurrency=workers * 2))
+    finally:
+        password_hashing.shutdown_executor()
+
+    per_second = count / elapsed
+    cores = min(workers, os.cpu_count() or 1)
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+    print(
+        f"rounds={rounds:<3} workers={workers:<3} "
+        f"{per_second:8.1f} logins/s  {per_second / cores:7.1f} logins/s/core  "
+        f"p50={p50:7.1f}ms  p99={p99:7.1f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="로그인(bcrypt 검증) 처리량 벤치마크")
+    parser.add_argument("--rounds", type=int, nargs="+", default=[int(os.getenv("BCRYPT_ROUNDS", "12"))])
+    parser.add_argument("--workers", type=int, nargs="+", default=[os.cpu_count() or 1])
+    parser.add_argument("--seconds", type=float, default=5.0, help="조합마다 측정할 시간(초)")
+    args = parser.parse_args()
+
+    print(f"CPU 코어: {os.cpu_count()}")
+    for rounds in args.rounds:
+        for workers in args.workers:
+            run(rounds, workers, args.seconds)
+
+
+if __name__ == "__main__":
+    main()
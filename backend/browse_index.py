@@ -0,0 +1,113 @@
+# browse_index.py
+
+import numpy as np
+import pandas as pd
+
+# 정렬 기준 → (카탈로그 컬럼, 큰 값이 먼저인지)
+#   popularity는 MAL 인기 순위(1위가 가장 인기)라 작은 값이 먼저, 0(순위 없음)은 맨 뒤
+SORT_COLUMNS = {
+    'score': ('Score', True),
+    'popularity': ('Popularity', False),
+    'favorites': ('Favorites', True),
+}
+# 필터가 있을 때 정렬 순서를 이만큼씩 잘라서 검사
+SCAN_CHUNK_SIZE = 4096
+
+
+def normalize_genre(genre) -> str:
+    return str(genre).strip().casefold()
+
+
+class CatalogBrowseIndex:
+    """
+    /animes 목록의 장르/점수 필터와 정렬을 요청마다 pandas로 거르고 정렬하지 않도록 미리 만들어 두는 색인입니다.
+    - 장르별 boolean 배열 (행 번호 → 그 장르인지)
+    - 정렬 기준별로 미리 정렬해 둔 행 번호 배열 (값이 없는 행은 맨 뒤)
+    - 요청이 오면 정렬된 배열을 앞에서부터 SCAN_CHUNK_SIZE개씩 잘라 필터를 벡터 연산으로 적용하고,
+      skip 이전 청크는 개수만 세고 건너뛰며 limit개가 모이면 멈춥니다.
+    - 점수 정렬 + 점수 범위는 이진 탐색으로 범위 밖을 처음부터 잘라냅니다.
+    """
+    def __init__(self, df, scores):
+        n = len(df)
+        self.scores = np.asarray(scores, dtype=np.float64)
+
+        self.genre_masks = {}
+        genres = df['genres'].fillna('').astype(str).str.split(',') if 'genres' in df.columns else pd.Series([[]] * n)
+        for row, row_genres in enumerate(genres):
+            for genre in row_genres:
+                genre = normalize_genre(genre)
+                if not genre or genre == 'unknown':
+                    continue
+                if genre not in self.genre_masks:
+                    self.genre_masks[genre] = np.zeros(n, dtype=bool)
+                self.genre_masks[genre][row] = True
+
+        self.orders = {None: np.arange(n, dtype=np.int32)}
+        for sort, (column, descending) in SORT_COLUMNS.items():
+            if column == 'Score':
+                values = self.scores
+            elif column in df.columns:
+                values = pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=np.float64)
+            else:
+                continue
+            if column == 'Popularity':
+                values = np.where(values > 0, values, np.nan)
+            keys = -values if descending else values
+            # 값이 없는 행은 맨 뒤, 같은 값이면 원래 순서 (stable)
+            self.orders[sort] = np.argsort(np.nan_to_num(keys, nan=np.inf), kind='stable').astype(np.int32)
+
+        # 점수 정렬 순서에서의 점수 (내림차순, 없는 값은 -inf) - 점수 범위를 이진 탐색으로 자를 때 사용
+        self._sorted_scores = np.nan_to_num(self.scores[self.orders['score']], nan=-np.inf)
+
+    def genres(self):
+        return sorted(self.genre_masks)
+
+    def query(self, genres=(), min_score=None, max_score=None, sort=None, skip: int = 0, limit: int = 20):
+        """
+        필터(장르는 모두 포함, 점수는 min_score ≤ 점수 ≤ max_score)를 통과한 행 번호를
+        sort 순서로 skip개 건너뛰고 최대 limit개 반환합니다. (sort가 None이면 원본 순서)
+        """
+        order = self.orders.get(sort, self.orders[None])
+        masks = []
+        for genre in genres:
+            mask = self.genre_masks.get(normalize_genre(genre))
+            if mask is None:
+                return []
+            masks.append(mask)
+
+        start, end = 0, len(order)
+        if sort == 'score' and (min_score is not None or max_score is not None):
+            # 내림차순 배열이므로 부호를 바꿔 오름차순으로 이진 탐색
+            # 점수 범위를 주면 점수가 없는 행(배열 맨 뒤의 -inf)은 항상 제외
+            negated = -self._sorted_scores
+            end = int(np.searchsorted(negated, np.inf, side='left'))
+            if max_score is not None:
+                start = int(np.searchsorted(negated, -max_score, side='left'))
+            if min_score is not None:
+                end = int(np.searchsorted(negated, -min_score, side='right'))
+            min_score = max_score = None
+
+        if not masks and min_score is None and max_score is None:
+            return order[start + skip:min(end, start + skip + limit)].tolist()
+
+        rows = []
+        remaining_skip = skip
+        for chunk_start in range(start, end, SCAN_CHUNK_SIZE):
+            chunk = order[chunk_start:min(end, chunk_start + SCAN_CHUNK_SIZE)]
+            keep = np.ones(len(chunk), dtype=bool)
+            for mask in masks:
+                keep &= mask[chunk]
+            if min_score is not None:
+                keep &= self.scores[chunk] >= min_score
+            if max_score is not None:
+                keep &= self.scores[chunk] <= max_score
+
+            matched = chunk[keep]
+            if remaining_skip >= len(matched):
+                remaining_skip -= len(matched)
+                continue
+            rows.extend(matched[remaining_skip:remaining_skip + limit - len(rows)].tolist())
+            remaining_skip = 0
+            if len(rows) >= limit:
+                break
+        return rows
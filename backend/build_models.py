@@ -0,0 +1,32 @@
+# build_models.py
+#
+# 서버를 띄우기 전에 모델 아티팩트를 미리 만들어 두는 오프라인 빌드 명령입니다.
+#   python build_models.py          # 원본 CSV가 바뀌었을 때만 다시 생성
+#   python build_models.py --force  # 무조건 다시 생성
+#   python build_models.py --add ../csv/now_anime.csv  # 전체 재학습 없이 신작만 추가
+
+import argparse
+import time
+
+from model_loader import load_all_models, add_titles_from_csv
+
+
+def main():
+    parser = argparse.ArgumentParser(description="추천 모델 아티팩트 빌드")
+    parser.add_argument("--force", action="store_true", help="체크섬과 상관없이 모델을 다시 생성합니다.")
+    parser.add_argument("--add", metavar="CSV", help="TF-IDF를 다시 학습하지 않고 CSV(now_anime.csv 형식)의 신작만 추가합니다.")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    data = load_all_models(force_rebuild=args.force)
+    if data is None:
+        raise SystemExit("❌ 모델 빌드 실패")
+
+    if args.add:
+        data = add_titles_from_csv(data, args.add) or data
+
+    print(f"✅ 모델 아티팩트 준비 완료. (version: {data['version']}, {time.perf_counter() - started:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
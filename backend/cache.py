@@ -0,0 +1,205 @@
+# cache.py
+
+import os
+import json
+import time
+import queue
+import sqlite3
+import threading
+from collections import OrderedDict
+
+# get()에서 '캐시에 없음'을 뜻하는 값 (None은 '없는 것으로 확인됨'을 캐시한 값이라 구분이 필요함)
+MISSING = object()
+
+# SQLite 쓰기를 한 번에 묶어서 커밋할 최대 개수
+SQLITE_WRITE_BATCH = 500
+# SQLite에서 만료된 행을 지우는 주기(초)
+SQLITE_PURGE_INTERVAL = 600
+
+
+class TTLCache:
+    """
+    최대 개수(max_entries)를 넘으면 가장 오래 안 쓴 항목부터 지우는(LRU) 메모리 캐시입니다.
+    - ttl: 값의 유효 시간(초), negative_ttl: None(조회 결과 없음)을 캐시할 유효 시간(초)
+    - sqlite_path를 주면 SQLite 파일에도 저장하여 서버를 재시작해도 캐시가 유지됩니다.
+      (이때 값은 JSON으로 저장할 수 있어야 합니다)
+      · 시작할 때 만료된 행을 지우고 남은 값(최대 max_entries개)을 메모리로 읽어 두므로, get()은 메모리만 봅니다.
+      · 쓰기는 큐에 넣고 백그라운드 스레드가 모아서 한 번에 커밋하므로, 요청 처리(이벤트 루프)가 디스크를 기다리지 않습니다.
+      · 만료된 행은 백그라운드 스레드가 SQLITE_PURGE_INTERVAL초마다 지웁니다.
+      · 연결과 스레드는 캐시를 처음 쓰는 프로세스에서 만듭니다. (serve.py는 import 후 워커를 fork하므로,
+        import 시점에 만들면 워커에는 쓰기 스레드가 없고 연결만 공유됨)
+    """
+    def __init__(self, max_entries: int, ttl: float, negative_ttl: float | None = None,
+                 sqlite_path: str | None = None, namespace: str = "default"):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self.namespace = namespace
+
+        self._entries = OrderedDict()  # key -> (만료 시각, 값)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._sqlite_path = sqlite_path
+        self._sqlite_pid = None  # SQLite 쓰기 스레드를 시작한 프로세스
+        self._sqlite_lock = threading.Lock()
+        self._writes = None
+
+    def get(self, key: str):
+        """캐시된 값(None 포함)을 반환하고, 없거나 만료됐으면 MISSING을 반환합니다."""
+        self._ensure_sqlite()
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return MISSING
+
+            self._entries.move_to_end(key)
+            if entry[1] is None:
+                self.negative_hits += 1
+            else:
+                self.hits += 1
+            return entry[1]
+
+    def peek(self, key: str):
+        """get()과 같지만 통계와 LRU 순서를 바꾸지 않고 메모리에서만 찾습니다."""
+        self._ensure_sqlite()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.time():
+                return MISSING
+            return entry[1]
+
+    def set(self, key: str, value):
+        """값을 저장합니다. value가 None이면 negative_ttl 동안 '없음'으로 캐시합니다."""
+        self._ensure_sqlite()
+        expires_at = time.time() + (self.negative_ttl if value is None else self.ttl)
+        with self._lock:
+            self._put(key, (expires_at, value))
+        if self._writes is not None:
+            self._writes.put((
+                "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(value), expires_at),
+            ))
+
+    def delete(self, key: str):
+        self._ensure_sqlite()
+        with self._lock:
+            self._entries.pop(key, None)
+        if self._writes is not None:
+            self._writes.put(("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key)))
+
+    def clear(self):
+        self._ensure_sqlite()
+        with self._lock:
+            self._entries.clear()
+        if self._writes is not None:
+            self._writes.put(("DELETE FROM cache WHERE namespace = ?", (self.namespace,)))
+
+    def flush(self):
+        """큐에 쌓인 SQLite 쓰기가 모두 커밋될 때까지 기다립니다. (종료 직전 등)"""
+        if self._sqlite_pid == os.getpid():
+            self._writes.join()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.negative_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.negative_hits) / lookups, 4) if lookups else 0.0,
+                "pending_writes": self._writes.qsize() if self._sqlite_pid == os.getpid() else 0,
+            }
+
+    def _put(self, key: str, entry):
+        # (lock을 잡은 상태에서 호출) 메모리에 넣고, 최대 개수를 넘으면 가장 오래된 항목부터 제거
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _ensure_sqlite(self):
+        # 이 프로세스에서 처음 쓰는 것이면 쓰기 큐와 스레드를 만듦 (fork된 워커도 자기 스레드를 가짐)
+        if self._sqlite_path is None or self._sqlite_pid == os.getpid():
+            return
+        with self._sqlite_lock:
+            if self._sqlite_pid == os.getpid():
+                return
+            self._writes = queue.Queue()
+            threading.Thread(target=self._write_loop, daemon=True, name=f"cache-writer-{self.namespace}").start()
+            self._sqlite_pid = os.getpid()
+
+    def _open_db(self):
+        # (쓰기 스레드에서 실행) 연결을 열고, 만료된 행을 지운 뒤 남은 값을 메모리로 읽어 둠
+        db = sqlite3.connect(self._sqlite_path)
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT, expires_at REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        db.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+        db.commit()
+
+        # 만료가 늦은(최근에 저장된) 값 max_entries개를, 이미 메모리에 있는 값보다 오래된 쪽(LRU 앞)에 넣음
+        rows = db.execute(
+            "SELECT key, value, expires_at FROM cache WHERE namespace = ? AND expires_at > ?"
+            " ORDER BY expires_at DESC LIMIT ?",
+            (self.namespace, time.time(), self.max_entries),
+        ).fetchall()
+        with self._lock:
+            for key, value, expires_at in rows:
+                # 읽는 동안 새로 저장된 값이 있으면 그 값을 유지
+                if key not in self._entries:
+                    self._entries[key] = (expires_at, json.loads(value))
+                    self._entries.move_to_end(key, last=False)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return db
+
+    def _write_loop(self):
+        # 쓰기 요청을 모아서 한 번에 커밋하고, 주기적으로 만료된 행을 지움
+        try:
+            db = self._open_db()
+        except sqlite3.Error as e:
+            print(f"⚠️ 캐시 SQLite 열기 실패 ({self.namespace}): {e}")
+            db = None
+        next_purge = time.time() + SQLITE_PURGE_INTERVAL
+        while True:
+            try:
+                batch = [self._writes.get(timeout=max(0.0, next_purge - time.time()))]
+            except queue.Empty:
+                batch = []
+            while batch and len(batch) < SQLITE_WRITE_BATCH:
+                try:
+                    batch.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                if db is None:
+                    continue
+                for statement, params in batch:
+                    db.execute(statement, params)
+                if time.time() >= next_purge:
+                    db.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+                    next_purge = time.time() + SQLITE_PURGE_INTERVAL
+                db.commit()
+            except sqlite3.Error as e:
+                print(f"⚠️ 캐시 SQLite 쓰기 실패 ({self.namespace}): {e}")
+            finally:
+                for _ in batch:
+                    self._writes.task_done()
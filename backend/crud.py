@@ -1,19 +1,47 @@
 # crud.py
 
+import os
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, delete, text
+from sqlalchemy.dialects.postgresql import insert
 from db import User  # db.py의 User 모델
 from schemas import UserCreate # schemas.py의 UserCreate 모델
-from db import User, UserFavorite
+from db import User, UserFavorite, AnimeFavoriteCount, AppMarker, STARTUP_LOCK_KEY, FAVORITE_COUNTS_MARKER
 from schemas import UserFavoriteCreate
+import schemas
+from cache import TTLCache, MISSING
+
+# 인증된 사용자 캐시 (토큰의 이메일 → schemas.User 스냅샷)
+#   인증이 필요한 요청마다 사용자 조회 쿼리를 하지 않도록 짧게 캐시합니다.
+#   비밀번호 변경/탈퇴 시 이 프로세스의 캐시는 바로 지우고, 다른 워커는 TTL이 지나면 반영됩니다.
+principal_cache = TTLCache(
+    max_entries=int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "10000")),
+    ttl=float(os.getenv("PRINCIPAL_CACHE_TTL", "60")),
+    namespace="principal",
+)
 
 #이메일로 사용자가 있는지 확인
-def get_user_by_email(db: Session, email: str):
+async def get_user_by_email(db: AsyncSession, email: str):
     
-    return db.query(User).filter(User.email == email).first()
+    result = await db.execute(select(User).filter(User.email == email))
+    return result.scalars().first()
+
+# 인증용 사용자 조회 (캐시에 없을 때만 DB 조회, 없는 사용자는 캐시하지 않음)
+async def get_principal_by_email(db: AsyncSession, email: str):
+    principal = principal_cache.get(email)
+    if principal is not MISSING:
+        return principal
+
+    db_user = await get_user_by_email(db, email=email)
+    if db_user is None:
+        return None
+    principal = schemas.User.model_validate(db_user)
+    principal_cache.set(email, principal)
+    return principal
 
 # 새로운 사용자 생성
-def create_user(db: Session, user: UserCreate, hashed_password: str):
+async def create_user(db: AsyncSession, user: UserCreate, hashed_password: str):
     # 1. DB 모델 객체 생성
     db_user = User(
         email=user.email, 
@@ -24,73 +52,224 @@ def create_user(db: Session, user: UserCreate, hashed_password: str):
     db.add(db_user)
     
     # 3. DB에 커밋 (실제 저장)
-    db.commit()
+    await db.commit()
     
     # 4. 생성된 객체를 다시 읽어옴 (ID 등 최신 정보 포함)
-    db.refresh(db_user)
+    await db.refresh(db_user)
     
     return db_user
 
 # 사용자 비번 업데이트
-def update_user_password(db: Session, user: User, hashed_password: str):
+async def update_user_password(db: AsyncSession, user_id: int, hashed_password: str):
 
+    user = await db.get(User, user_id)
+    if user is None:
+        return None
     user.hashed_password = hashed_password
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
+    principal_cache.delete(user.email)
     return user
 
 # 회원탈퇴
-def delete_user(db: Session, user: User):
+async def delete_user(db: AsyncSession, user_id: int):
 
-    # 1. auth.get_current_user가 찾아준 user 객체를 삭제 대상으로 지정
-    db.delete(user)
+    # 1. auth.get_current_user가 확인한 사용자 id로 삭제 대상을 찾음
+    user = await db.get(User, user_id)
+    if user is None:
+        return None
+    await db.delete(user)
     
     # 2. DB에 변경 사항(삭제) 저장
-    db.commit()
+    await db.commit()
+    principal_cache.delete(user.email)
     
     # 3. 삭제된 user 객체 반환 (JSON 응답용)
     return user
 
 #(중복 체크용) 특정 유저가 특정 애니를 찜했는지 확인
-def get_favorite_by_anime_id(db: Session, user_id: int, anime_id: int):
-    return db.query(UserFavorite).filter(
+async def get_favorite_by_anime_id(db: AsyncSession, user_id: int, anime_id: int):
+    result = await db.execute(select(UserFavorite).filter(
         UserFavorite.user_id == user_id, 
         UserFavorite.anime_id == anime_id
-    ).first()
+    ))
+    return result.scalars().first()
 
 #특정 유저의 '모든' 즐겨찾기 목록을 조회
-def get_user_favorites(db: Session, user_id: int):
-    return db.query(UserFavorite).filter(UserFavorite.user_id == user_id).all()
+async def get_user_favorites(db: AsyncSession, user_id: int):
+    result = await db.execute(select(UserFavorite).filter(UserFavorite.user_id == user_id).order_by(UserFavorite.id))
+    return result.scalars().all()
+
+#특정 유저의 즐겨찾기 anime_id만 조회 (추천 계산용, ORM 객체를 만들지 않음)
+async def get_user_favorite_anime_ids(db: AsyncSession, user_id: int):
+    result = await db.scalars(select(UserFavorite.anime_id).filter(UserFavorite.user_id == user_id))
+    return result.all()
+
+#특정 유저의 즐겨찾기 버전 (개수, 가장 큰 id) - 추가/삭제하면 바뀜 ((user_id, id) 인덱스만 읽음)
+async def get_user_favorites_version(db: AsyncSession, user_id: int):
+    result = await db.execute(
+        select(func.count(UserFavorite.id), func.max(UserFavorite.id)).filter(UserFavorite.user_id == user_id)
+    )
+    count, max_id = result.one()
+    return count, max_id or 0
+
+#특정 유저의 즐겨찾기 목록을 커서(마지막으로 받은 id) 기준으로 limit개 조회
+async def get_user_favorites_page(db: AsyncSession, user_id: int, limit: int, after_id: int | None = None):
+    """
+    (즐겨찾기 목록, 다음 페이지 커서)를 반환합니다. 마지막 페이지면 커서는 None
+    (다음 페이지가 있는지 알기 위해 limit + 1개를 읽음)
+    """
+    # SQL: SELECT ... WHERE user_id = :user_id AND id > :after_id ORDER BY id LIMIT :limit + 1
+    #      ((user_id, id) 인덱스를 따라 읽으므로 OFFSET과 달리 뒤 페이지도 빠름)
+    statement = select(UserFavorite).filter(UserFavorite.user_id == user_id)
+    if after_id is not None:
+        statement = statement.filter(UserFavorite.id > after_id)
+    result = await db.execute(statement.order_by(UserFavorite.id).limit(limit + 1))
+    favorites = result.scalars().all()
+    if len(favorites) > limit:
+        return favorites[:limit], favorites[limit - 1].id
+    return favorites, None
 
 #새로운 즐겨찾기를 DB에 생성
-def create_user_favorite(db: Session, favorite: UserFavoriteCreate, user_id: int):
-    # 1. 스키마(favorite)와 user_id를 합쳐서 DB 모델 객체 생성
-    db_favorite = UserFavorite(
+#   이미 찜한 애니면 None (확인 후 추가하면 동시에 같은 요청이 오면 유니크 인덱스 위반이 나므로 한 문장으로 처리)
+async def create_user_favorite(db: AsyncSession, favorite: UserFavoriteCreate, user_id: int):
+    # SQL: INSERT INTO user_favorites ... ON CONFLICT (user_id, anime_id) DO NOTHING RETURNING *
+    statement = insert(UserFavorite).values(
         **favorite.model_dump(),  # anime_id, title, image_url 포함
-        user_id=user_id
+        user_id=user_id,
     )
-    
-    # 2. DB에 추가 및 저장
-    db.add(db_favorite)
-    db.commit()
-    db.refresh(db_favorite)
-    
+    statement = statement.on_conflict_do_nothing(index_elements=[UserFavorite.user_id, UserFavorite.anime_id])
+    db_favorite = (await db.scalars(statement.returning(UserFavorite))).first()
+    if db_favorite is None:
+        await db.rollback()
+        return None
+
+    # 애니별 즐겨찾기 수도 같은 트랜잭션에서 갱신
+    await _adjust_favorite_count(db, anime_id=favorite.anime_id, delta=1)
+    await db.commit()
     return db_favorite
 
 #DB에서 즐겨찾기 레코드 삭제
-def delete_user_favorite(db: Session, db_favorite: UserFavorite):
+async def delete_user_favorite(db: AsyncSession, db_favorite: UserFavorite):
     
-    db.delete(db_favorite)
-    db.commit()
+    await db.delete(db_favorite)
+    await _adjust_favorite_count(db, anime_id=db_favorite.anime_id, delta=-1)
+    await db.commit()
     return db_favorite
 
-def get_favorites_count_by_anime_id(db: Session, anime_id: int):
+#즐겨찾기 여러 개를 한 번에 추가 (이미 찜한 애니는 건너뜀), 새로 추가된 것만 반환
+async def create_user_favorites(db: AsyncSession, favorites: list[UserFavoriteCreate], user_id: int):
+    rows = {}
+    for favorite in favorites:
+        rows.setdefault(favorite.anime_id, {**favorite.model_dump(), "user_id": user_id})
+
+    # SQL: INSERT INTO user_favorites ... VALUES (...), (...) ON CONFLICT (user_id, anime_id) DO NOTHING RETURNING *
+    # 같은 사용자의 동시 일괄 추가가 유니크 인덱스를 서로 다른 순서로 잠그지 않도록 anime_id 순으로 넣음
+    statement = insert(UserFavorite).values([rows[anime_id] for anime_id in sorted(rows)])
+    statement = statement.on_conflict_do_nothing(index_elements=[UserFavorite.user_id, UserFavorite.anime_id])
+    created = (await db.scalars(statement.returning(UserFavorite))).all()
+
+    await _adjust_favorite_counts(db, anime_ids=[favorite.anime_id for favorite in created], delta=1)
+    await db.commit()
+    return created
+
+#즐겨찾기 여러 개를 한 번에 삭제, 실제로 삭제된 것만 반환
+async def delete_user_favorites(db: AsyncSession, anime_ids: list[int], user_id: int):
+    # SQL: DELETE FROM user_favorites WHERE user_id = :user_id AND anime_id IN (...) RETURNING *
+    statement = delete(UserFavorite).where(
+        UserFavorite.user_id == user_id,
+        UserFavorite.anime_id.in_(sorted(set(anime_ids))),
+    ).returning(UserFavorite)
+    deleted = (await db.scalars(statement)).all()
+
+    await _adjust_favorite_counts(db, anime_ids=[favorite.anime_id for favorite in deleted], delta=-1)
+    await db.commit()
+    return deleted
+
+async def get_favorites_count_by_anime_id(db: AsyncSession, anime_id: int):
     """
     특정 anime_id가 user_favorites 테이블에 몇 번 등장하는지 카운트합니다.
     """
     # SQL: SELECT count(*) FROM user_favorites WHERE anime_id = :anime_id
-    count = db.query(func.count(UserFavorite.id)).filter(
+    count = await db.scalar(select(func.count(UserFavorite.id)).filter(
         UserFavorite.anime_id == anime_id
-    ).scalar() # scalar()는 숫자 값(count)만 반환
+    )) # scalar()는 숫자 값(count)만 반환
     
-    return count
\ No newline at end of file
+    return count
+
+
+# 애니별 즐겨찾기 수를 어디서 읽을지
+#   "aggregate": user_favorites를 GROUP BY로 집계 / "table": anime_favorite_counts 집계 테이블
+FAVORITE_COUNTS_SOURCE = os.getenv("FAVORITE_COUNTS_SOURCE", "aggregate")
+
+async def get_favorites_counts_by_anime_ids(db: AsyncSession, anime_ids: list[int]):
+    """
+    여러 anime_id의 즐겨찾기 수를 한 번의 쿼리로 조회하여 {anime_id: count}로 반환합니다.
+    (즐겨찾기가 없는 anime_id는 결과에 없음)
+    """
+    anime_ids = [anime_id for anime_id in set(anime_ids) if anime_id is not None]
+    if not anime_ids:
+        return {}
+
+    if FAVORITE_COUNTS_SOURCE == "table":
+        # SQL: SELECT anime_id, count FROM anime_favorite_counts WHERE anime_id IN (...)
+        statement = select(AnimeFavoriteCount.anime_id, AnimeFavoriteCount.count).filter(
+            AnimeFavoriteCount.anime_id.in_(anime_ids)
+        )
+    else:
+        # SQL: SELECT anime_id, count(*) FROM user_favorites WHERE anime_id IN (...) GROUP BY anime_id
+        statement = select(UserFavorite.anime_id, func.count(UserFavorite.id)).filter(
+            UserFavorite.anime_id.in_(anime_ids)
+        ).group_by(UserFavorite.anime_id)
+
+    result = await db.execute(statement)
+    return {anime_id: count for anime_id, count in result.all()}
+
+async def _adjust_favorite_count(db: AsyncSession, anime_id: int, delta: int):
+    await _adjust_favorite_counts(db, anime_ids=[anime_id], delta=delta)
+
+async def _adjust_favorite_counts(db: AsyncSession, anime_ids: list[int], delta: int):
+    """
+    집계 테이블에서 anime_ids(중복 없음) 각각의 즐겨찾기 수를 delta만큼 바꿉니다. (커밋은 호출한 쪽에서)
+    집계 테이블을 쓰는 모드("table")일 때만 갱신합니다. (다른 모드로 바꾸면 다음 시작 시 다시 채움 - sync_favorite_counts)
+    SQL: INSERT ... VALUES (...), (...) ON CONFLICT (anime_id) DO UPDATE SET count = count + delta
+    """
+    if FAVORITE_COUNTS_SOURCE != "table" or not anime_ids:
+        return
+    # 행 잠금을 항상 anime_id 순서로 잡도록 정렬 (요청마다 순서가 다르면 동시 일괄 추가/삭제가 교착 상태에 빠짐)
+    statement = insert(AnimeFavoriteCount).values(
+        [{"anime_id": anime_id, "count": max(delta, 0)} for anime_id in sorted(set(anime_ids))]
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[AnimeFavoriteCount.anime_id],
+        set_={"count": AnimeFavoriteCount.count + delta},
+    )
+    await db.execute(statement)
+
+# (아래 함수들은 서버 시작 시 동기 세션으로 실행)
+
+def rebuild_favorite_counts(db: Session):
+    """
+    집계 테이블을 user_favorites 기준으로 다시 채웁니다. (커밋은 호출한 쪽에서)
+    """
+    db.query(AnimeFavoriteCount).delete()
+    counts = db.query(UserFavorite.anime_id, func.count(UserFavorite.id)).group_by(UserFavorite.anime_id).all()
+    db.add_all(AnimeFavoriteCount(anime_id=anime_id, count=count) for anime_id, count in counts)
+
+def sync_favorite_counts(db: Session):
+    """
+    집계 테이블을 FAVORITE_COUNTS_SOURCE에 맞춥니다.
+    - "table": 표시(AppMarker)가 없으면 user_favorites 기준으로 한 번만 다시 채우고 표시를 남김
+    - 그 외: 집계 테이블을 갱신하지 않으므로 표시를 지워서, 나중에 "table"로 바꾸면 다시 채우게 함
+    여러 워커가 동시에 시작해도 advisory lock으로 한 워커씩 실행되고, 나머지는 표시를 보고 건너뜁니다.
+    """
+    db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": STARTUP_LOCK_KEY})
+    marker = db.get(AppMarker, FAVORITE_COUNTS_MARKER)
+    if FAVORITE_COUNTS_SOURCE != "table":
+        if marker is not None:
+            db.delete(marker)
+    elif marker is None:
+        rebuild_favorite_counts(db)
+        db.add(AppMarker(name=FAVORITE_COUNTS_MARKER))
+        print("   ✓ 즐겨찾기 수 집계 테이블을 채웠습니다.")
+    db.commit()  # 커밋하면서 advisory lock도 풀림
@@ -1,10 +1,152 @@
-from recommender import RecommenderService
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from fastapi import HTTPException, status
+
+from recommender import RecommenderService, result_cache, user_result_cache
+from model_loader import CATALOG_CSV, BEHAVIOR_CSV, NEW_TITLES_CSV, add_titles_from_csv
+
+# 원본 CSV 변경을 확인하는 주기(초). 0이면 파일 감시를 하지 않음
+MODEL_WATCH_INTERVAL = float(os.getenv("MODEL_WATCH_INTERVAL", "0"))
+# 모델 로드 전 503 응답에 넣을 Retry-After(초)
+MODEL_RETRY_AFTER = os.getenv("MODEL_RETRY_AFTER", "10")
+
+
+class RecommenderHolder:
+    """
+    현재 서비스 중인 RecommenderService를 들고 있다가, 새 모델이 준비되면 참조만 바꿔 끼웁니다.
+    - 새 모델은 백그라운드 스레드에서 만들고, 다 만들어진 뒤에 self.current를 한 번에 교체
+    - 요청은 시작할 때 받은 서비스 객체를 끝까지 쓰므로, 처리 중인 요청은 예전 모델로 마무리됨
+    """
+    def __init__(self, service: RecommenderService):
+        self.current = service
+        self._reload_lock = threading.Lock()
+        self.reloading = False
+        self.last_reload = None
+        self._watcher = None
+
+    def status(self):
+        return {
+            "is_loaded": self.current.is_loaded,
+            "model_version": getattr(self.current, "model_version", None),
+            "reloading": self.reloading,
+            "last_reload": self.last_reload,
+        }
+
+    def reload(self, force_rebuild: bool = False):
+        """새 모델을 만들어 교체합니다. (이미 다른 재로드가 진행 중이면 False)"""
+        return self._replace(lambda: RecommenderService(force_rebuild=force_rebuild))
+
+    def add_titles(self, path: str = NEW_TITLES_CSV):
+        """
+        CSV의 신작을 현재 모델에 증분 추가한 새 모델로 교체합니다. (전체 재학습 없음)
+        (이미 다른 재로드가 진행 중이면 False)
+        """
+        def _build():
+            new_data = add_titles_from_csv(self.current.model_data, path)
+            if new_data is None:
+                print("   ↻ 추가할 신작이 없습니다.")
+                return self.current
+            return RecommenderService(model_data=new_data)
+
+        return self._replace(_build)
+
+    def _replace(self, build):
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+        self.reloading = True
+        started = time.perf_counter()
+        try:
+            try:
+                new_service = build()
+            except Exception as e:
+                # 예외로 실패해도 기존 모델을 계속 사용하고, 실패를 last_reload에 남김
+                self.last_reload = {"ok": False, "at": datetime.now(timezone.utc).isoformat(), "error": str(e)}
+                print(f"❌ 모델 재로드 실패: {e}. 기존 모델을 계속 사용합니다.")
+                return True
+            if not new_service.is_loaded:
+                # 새 모델이 실패하면 기존 모델을 계속 사용
+                self.last_reload = {"ok": False, "at": datetime.now(timezone.utc).isoformat()}
+                print("❌ 모델 재로드 실패. 기존 모델을 계속 사용합니다.")
+                return True
+
+            previous_version = getattr(self.current, "model_version", None)
+            self.current = new_service
+            if previous_version != new_service.model_version:
+                # 응답 캐시 키에 모델 버전이 들어 있어 예전 결과는 쓰이지 않지만, 메모리를 바로 비움
+                result_cache.clear()
+                user_result_cache.clear()
+
+            self.last_reload = {
+                "ok": True,
+                "at": datetime.now(timezone.utc).isoformat(),
+                "model_version": new_service.model_version,
+                "seconds": round(time.perf_counter() - started, 2),
+            }
+            print(f"✅ 모델 교체 완료. (version: {previous_version} → {new_service.model_version})")
+            return True
+        finally:
+            self.reloading = False
+            self._reload_lock.release()
+
+    def reload_in_background(self, force_rebuild: bool = False):
+        """재로드를 백그라운드 스레드로 시작합니다. (이미 진행 중이면 False)"""
+        return self._run_in_background(self.reload, force_rebuild)
+
+    def add_titles_in_background(self, path: str = NEW_TITLES_CSV):
+        """신작 증분 추가를 백그라운드 스레드로 시작합니다. (이미 진행 중이면 False)"""
+        return self._run_in_background(self.add_titles, path)
+
+    def _run_in_background(self, target, *args):
+        if self.reloading:
+            return False
+        threading.Thread(target=target, args=args, daemon=True, name="model-reload").start()
+        return True
+
+    def start_watcher(self, interval: float = MODEL_WATCH_INTERVAL):
+        """
+        원본 CSV의 수정 시각을 interval초마다 확인하여, 바뀌면 재로드합니다.
+        (워커마다 감시하지만 학습은 아티팩트 파일 락을 먼저 잡은 워커 하나만 하고, 나머지는 결과를 로드)
+        """
+        if interval <= 0 or self._watcher is not None:
+            return
+
+        def _source_mtimes():
+            return tuple(os.path.getmtime(path) if os.path.exists(path) else None for path in (CATALOG_CSV, BEHAVIOR_CSV))
+
+        def _watch():
+            last_seen = _source_mtimes()
+            while True:
+                time.sleep(interval)
+                current = _source_mtimes()
+                if current != last_seen and self.reload():
+                    last_seen = current
+
+        self._watcher = threading.Thread(target=_watch, daemon=True, name="model-watcher")
+        self._watcher.start()
+
+
+# 1. import 시점에는 빈 서비스로 시작하고, 실제 모델은 앱 lifespan에서 백그라운드로 로드합니다.
+#    (모델 로드 중에도 서버가 바로 연결을 받아 /healthz에 응답할 수 있음 - main.py 참고)
+recommender_holder = RecommenderHolder(RecommenderService.not_loaded())
+
+
+def model_not_ready():
+    """모델이 아직 로드되지 않았을 때의 503 응답 (Retry-After 포함)"""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="모델이 아직 로드 중입니다.",
+        headers={"Retry-After": MODEL_RETRY_AFTER},
+    )
 
-# 1. 앱이 시작될 때 '단 한 번' RecommenderService를 초기화합니다.
-#    (터미널에 "🚀 Recommender Service 초기화..."가 한 번만 떠야 함)
-recommender_service_instance = RecommenderService()
 
 # 2. FastAPI의 Depends()가 이 함수를 호출하여
-#    미리 생성된 인스턴스를 '재사용'합니다.
+#    현재 서비스 중인 인스턴스를 '재사용'합니다. (재로드되면 새 인스턴스)
+#    모델이 로드되기 전에는 라우트를 실행하지 않고 바로 503을 반환
 def get_recommender_service():
-    return recommender_service_instance
\ No newline at end of file
+    service = recommender_holder.current
+    if not service.is_loaded:
+        raise model_not_ready()
+    return service
@@ -1,36 +1,193 @@
 # jikan_client.py
 
+import os
+import time
 import httpx
 import urllib.parse
 import asyncio
 
+from cache import TTLCache, MISSING
+from singleflight import SingleFlight
+
 JIKAN_BASE_URL = "https://api.jikan.moe/v4"
 
+# Jikan 응답 캐시 (mal_id와 제목 두 가지 키로 저장)
+#   JIKAN_CACHE_DB를 지정하면 SQLite 파일에도 저장하여 재시작 후에도 유지됨
+enrichment_cache = TTLCache(
+    max_entries=int(os.getenv("JIKAN_CACHE_MAX_ENTRIES", "10000")),
+    ttl=float(os.getenv("JIKAN_CACHE_TTL", "86400")),
+    negative_ttl=float(os.getenv("JIKAN_CACHE_NEGATIVE_TTL", "3600")),
+    sqlite_path=os.getenv("JIKAN_CACHE_DB") or None,
+    namespace="jikan",
+)
+
+
+class TokenBucket:
+    """
+    비동기 토큰 버킷 리미터. 초당 rate개씩 토큰이 차고 최대 capacity개까지 쌓입니다.
+    acquire()는 토큰이 생길 때까지 기다렸다가 하나를 가져갑니다.
+    """
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+# Jikan API 제한(초당 3회, 분당 60회)에 맞춘 프로세스 전체 공용 리미터
+JIKAN_RATE_PER_SECOND = int(os.getenv("JIKAN_RATE_PER_SECOND", "3"))
+JIKAN_RATE_PER_MINUTE = int(os.getenv("JIKAN_RATE_PER_MINUTE", "60"))
+_rate_limiters = [
+    TokenBucket(rate=JIKAN_RATE_PER_SECOND, capacity=JIKAN_RATE_PER_SECOND),
+    TokenBucket(rate=JIKAN_RATE_PER_MINUTE / 60, capacity=JIKAN_RATE_PER_MINUTE),
+]
+
+# 같은 작품을 동시에 여러 번 조회하면 Jikan 호출은 한 번만 하고 결과를 함께 받음
+fetch_flight = SingleFlight()
+
+# 앱이 살아있는 동안 함께 쓰는 HTTP 클라이언트 (커넥션/TLS 세션 재사용)
+_client: httpx.AsyncClient | None = None
+
+
+def get_client():
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            base_url=JIKAN_BASE_URL,
+            timeout=10.0,
+            limits=httpx.Limits(max_keepalive_connections=5, max_connections=10),
+        )
+    return _client
+
+
+async def close_client():
+    """앱 종료 시 공용 클라이언트의 커넥션을 정리합니다."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def _wait_for_rate_limit():
+    for limiter in _rate_limiters:
+        await limiter.acquire()
+
+
+def _title_key(title: str):
+    return f"title:{title.casefold()}"
+
+
+def _id_key(mal_id):
+    return f"id:{mal_id}"
+
+
+def peek_cached_details(title: str, mal_id=None):
+    """
+    네트워크 호출 없이 캐시에 있는 Jikan 정보만 확인합니다. (mal_id 키를 먼저 확인)
+    (캐시에 없거나 만료됐으면 MISSING, '결과 없음'이 캐시돼 있으면 None)
+    """
+    if mal_id is not None:
+        cached = enrichment_cache.peek(_id_key(mal_id))
+        if cached is not MISSING:
+            return cached
+    return enrichment_cache.peek(_title_key(title))
+
+
+def _parse_details(details: dict):
+    return {
+        "title": details.get('title'),
+        "image_url": details.get('images', {}).get('jpg', {}).get('image_url'),
+        "score": details.get('score'),
+        "mal_id": details.get('mal_id')
+    }
+
+
+async def fetch_candidate_details(title: str, mal_id=None):
+    """추천 후보 정보 조회: mal_id를 알면 ID로 정확히 조회하고, 모르면 제목 검색으로 조회합니다."""
+    if mal_id is not None:
+        return await fetch_anime_details_by_id(mal_id, title=title)
+    return await fetch_anime_details(title)
+
+
+async def fetch_anime_details_by_id(mal_id: int, title: str | None = None):
+    """
+    Jikan API의 /anime/{id}로 상세 정보를 가져오는 비동기 함수
+    (제목 검색보다 빠르고 항상 같은 작품을 돌려주며, mal_id로 캐시할 수 있음)
+    Jikan v4에는 여러 ID를 한 번에 조회하는 API가 없으므로, 여러 개는 동시에 호출합니다.
+    """
+    cached = enrichment_cache.get(_id_key(mal_id))
+    if cached is not MISSING:
+        return cached
+    return await fetch_flight.do(_id_key(mal_id), _request_anime_by_id, mal_id, title)
+
+
+async def _request_anime_by_id(mal_id: int, title: str | None):
+    try:
+        await _wait_for_rate_limit()
+        response = await get_client().get(f"/anime/{int(mal_id)}")
+        if response.status_code == 404:
+            # 없는 ID도 잠시 캐시하여 같은 요청을 반복하지 않게 함
+            enrichment_cache.set(_id_key(mal_id), None)
+            return None
+        response.raise_for_status()
+        details = response.json().get('data')
+
+        if details:
+            result = _parse_details(details)
+            enrichment_cache.set(_id_key(mal_id), result)
+            if title is not None:
+                enrichment_cache.set(_title_key(title), result)
+            return result
+
+        enrichment_cache.set(_id_key(mal_id), None)
+    except Exception as e:
+        # 오류가 나도 로그만 남기고 None 반환 (일시적인 오류일 수 있으므로 캐시하지 않음)
+        print(f"⚠️ Jikan API 호출 실패 for mal_id={mal_id}: {e}")
+    return None
+
+
 async def fetch_anime_details(title: str):
     """Jikan API에서 애니메이션 제목으로 상세 정보를 가져오는 비동기 함수"""
+    cached = enrichment_cache.get(_title_key(title))
+    if cached is not MISSING:
+        return cached
+    return await fetch_flight.do(_title_key(title), _request_anime_by_title, title)
+
+
+async def _request_anime_by_title(title: str):
     encoded_title = urllib.parse.quote(title) 
-    
-    # 안정적인 요청 설정을 유지합니다.
-    async with httpx.AsyncClient(timeout=10.0, limits=httpx.Limits(max_keepalive_connections=5, max_connections=10)) as client:
-        url = f"{JIKAN_BASE_URL}/anime?q={encoded_title}&limit=1"
-        
-        try:
-            # Jikan API의 Rate Limit을 피하기 위한 딜레이
-            # 이 함수를 호출하기 전에 recommender.py에서 딜레이를 주는 것이 더 효율적입니다.
-            response = await client.get(url)
-            response.raise_for_status() 
-            data = response.json().get('data', [])
-
-            if data:
-                details = data[0]
-                return {
-                    "title": details.get('title'),
-                    "image_url": details.get('images', {}).get('jpg', {}).get('image_url'),
-                    "score": details.get('score'),
-                    "mal_id": details.get('mal_id')
-                }
-        except Exception as e:
-            # 오류가 나도 로그만 남기고 None 반환
-            print(f"⚠️ Jikan API 호출 실패 for '{title}': {e}")
-            pass 
-        return None
\ No newline at end of file
+    url = f"/anime?q={encoded_title}&limit=1"
+
+    try:
+        # Jikan API의 Rate Limit을 넘지 않도록 토큰을 받은 뒤 호출
+        await _wait_for_rate_limit()
+        response = await get_client().get(url)
+        response.raise_for_status() 
+        data = response.json().get('data', [])
+
+        if data:
+            result = _parse_details(data[0])
+            enrichment_cache.set(_title_key(title), result)
+            if result["mal_id"] is not None:
+                enrichment_cache.set(_id_key(result["mal_id"]), result)
+            return result
+
+        # 검색 결과가 없는 제목도 잠시 캐시하여 같은 요청을 반복하지 않게 함
+        enrichment_cache.set(_title_key(title), None)
+    except Exception as e:
+        # 오류가 나도 로그만 남기고 None 반환 (일시적인 오류일 수 있으므로 캐시하지 않음)
+        print(f"⚠️ Jikan API 호출 실패 for '{title}': {e}")
+        pass 
+    return None
@@ -1,16 +1,58 @@
 # main.py
 
-from fastapi import FastAPI, HTTPException
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 #모듈 가져오기
-from recommender import RecommenderService
-from db import Base, engine, get_db
+from recommender import RecommenderService, result_cache, user_result_cache
+from db import Base, engine, async_engine, SessionLocal, create_missing_indexes
+import crud
 from user_router import router as user_router 
 from anime_router import router as anime_router
-#DB 테이블 생성
-Base.metadata.create_all(bind=engine)
+from admin_router import router as admin_router
+from dependencies import recommender_holder, MODEL_RETRY_AFTER
+from jikan_client import enrichment_cache, fetch_flight, close_client
+import password_hashing
+
+
+def prepare_database():
+    """
+    서버 시작 시 DB 준비 작업 (import 시점이 아니라 lifespan에서 실행)
+    실패하면 예외를 그대로 올려서 서버가 시작되지 않게 함
+    """
+    #DB 테이블 생성
+    Base.metadata.create_all(bind=engine)
+    create_missing_indexes()
+    # 즐겨찾기 수 집계 테이블을 FAVORITE_COUNTS_SOURCE에 맞춤 (처음 "table" 모드로 시작할 때 한 번만 채움)
+    with SessionLocal() as db:
+        crud.sync_favorite_counts(db)
+    print("✅ 데이터베이스 준비 완료")
+
+
 # --- 1. FastAPI 앱 인스턴스 생성 및 설정 ---
-app = FastAPI() 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 추천 모델은 백그라운드 스레드에서 로드 (로드가 끝날 때까지 /readyz와 모델 API는 503)
+    recommender_holder.reload_in_background()
+    # MODEL_WATCH_INTERVAL이 설정돼 있으면 원본 CSV 변경 시 자동 재로드
+    recommender_holder.start_watcher()
+    # 모델이 로드되는 동안 DB 준비 (동기 엔진이므로 스레드에서 실행, 끝나야 요청을 받기 시작)
+    try:
+        await asyncio.to_thread(prepare_database)
+    except Exception as e:
+        print(f"❌ 데이터베이스 준비 실패: {e}")
+        raise
+    yield
+    # 종료 시 Jikan 공용 HTTP 클라이언트와 DB 커넥션 풀 정리
+    await close_client()
+    await async_engine.dispose()
+    password_hashing.shutdown_executor()
+    # SQLite 캐시에 아직 커밋되지 않은 쓰기를 마저 저장
+    enrichment_cache.flush()
+    result_cache.flush()
+
+app = FastAPI(lifespan=lifespan) 
 
 # CORS 설정
 origins = ["http://localhost:3000"]
@@ -20,6 +62,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # 즐겨찾기 목록 다음 페이지 커서
 )
 
 
@@ -42,5 +85,38 @@ app.include_router(
     prefix="/animes",     # 👈 주소 http://.../animes 로 시작
     tags=["Animes"]       # 👈 API 문서 태그
 )
+app.include_router(
+    admin_router,
+    prefix="/admin",
+    tags=["Admin"]
+)
 # --- 3. api 엔드포인트 ---
 
+
+# 프로세스가 살아 있는지 (모델 로드 여부와 상관없이 항상 200)
+@app.get("/healthz")
+def read_health():
+    return {"status": "ok"}
+
+
+# 요청을 받을 준비가 됐는지 (모델 로드가 끝나야 200, 그 전에는 503 + Retry-After)
+@app.get("/readyz")
+def read_ready(response: Response):
+    model_status = recommender_holder.status()
+    if not model_status["is_loaded"]:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        response.headers["Retry-After"] = MODEL_RETRY_AFTER
+    return {"status": "ready" if model_status["is_loaded"] else "loading", "model": model_status}
+
+
+# 캐시 적중/실패 횟수 등 운영 지표
+@app.get("/metrics")
+def read_metrics():
+    return {
+        "recommend_cache": result_cache.stats(),
+        "user_recommend_cache": user_result_cache.stats(),
+        "jikan_cache": enrichment_cache.stats(),
+        "jikan_fetch": fetch_flight.stats(),
+        "principal_cache": crud.principal_cache.stats(),
+        "password_hashing": password_hashing.stats(),
+    }
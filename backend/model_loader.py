@@ -1,24 +1,198 @@
 # model_loader.py
 
+import os
+import numpy as np
 import pandas as pd
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import linear_kernel
+from scipy import sparse
+import hashlib
+from datetime import datetime, timezone
+import model_store
 
-def load_all_models():
+CATALOG_CSV = os.getenv("CATALOG_CSV", "../csv/anime-dataset-2023.csv")
+BEHAVIOR_CSV = os.getenv("BEHAVIOR_CSV", "../csv/recommend_anime_5000.csv")
+# 전체 재학습 없이 카탈로그에 추가할 신작 목록 (now_anime.csv 형식)
+NEW_TITLES_CSV = os.getenv("NEW_TITLES_CSV", "../csv/now_anime.csv")
+
+# now_anime.csv(Jikan 형식) 컬럼 → 카탈로그(anime-dataset-2023) 컬럼
+NEW_TITLE_COLUMNS = {
+    'mal_id': 'anime_id',
+    'title': 'title',
+    'title_english': 'English name',
+    'title_japanese': 'Other name',
+    'image_url': 'image_url',
+    'synopsis': 'synopsis',
+    'genres': 'genres',
+    'score': 'Score',
+    'scored_by': 'Scored By',
+    'rank': 'Rank',
+    'popularity': 'Popularity',
+    'source': 'Source',
+}
+
+NO_IMAGE_URL = "../images/no_img.png"
+
+TFIDF_PARAMS = dict(max_features=5000, stop_words='english', ngram_range=(1, 2), min_df=2)
+
+# 유사도 저장 방식: "neighbors" (제목별 상위 K개 이웃만 저장) 또는 "dense" (N×N 전체 행렬)
+SIMILARITY_MODE = os.getenv("SIMILARITY_MODE", "neighbors")
+NEIGHBOR_TOP_K = int(os.getenv("NEIGHBOR_TOP_K", "100"))
+NEIGHBOR_BLOCK_SIZE = int(os.getenv("NEIGHBOR_BLOCK_SIZE", "512"))
+
+
+# 행동 데이터 최근성 가중치의 반감기(일): 가장 최근 기록보다 이만큼 오래된 추천 쌍은 가중치가 절반 (0이면 최근성 무시)
+BEHAVIOR_HALF_LIFE_DAYS = float(os.getenv("BEHAVIOR_HALF_LIFE_DAYS", "180"))
+
+
+def model_settings():
+    """아티팩트 manifest에 기록하는 모델 설정 (바뀌면 저장된 아티팩트를 쓰지 않고 다시 생성)"""
+    settings = {"tfidf_params": TFIDF_PARAMS}
+    if SIMILARITY_MODE != "dense":
+        settings["neighbor_top_k"] = NEIGHBOR_TOP_K
+    return settings
+
+
+def top_k_per_row(scores, k: int):
+    """
+    2차원 점수 배열의 각 행에서 상위 k개만 부분 선택(argpartition)한 뒤
+    그 k개만 (점수 내림차순, 열 번호 오름차순)으로 정렬하여 (열 번호, 점수)를 반환합니다.
+    """
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.lexsort((part, -part_scores), axis=1)
+    return np.take_along_axis(part, order, axis=1), np.take_along_axis(part_scores, order, axis=1)
+
+
+def build_neighbor_index(tfidf_matrix, top_k: int = NEIGHBOR_TOP_K, block_size: int = NEIGHBOR_BLOCK_SIZE):
+    """
+    TF-IDF 행렬을 block_size 행씩 나누어 유사도를 계산하고,
+    제목마다 자기 자신을 제외한 상위 top_k개 이웃의 (행 번호, 점수)만 남깁니다.
+    반환값: (neighbor_ids[int32, N×K], neighbor_scores[float32, N×K]) - 점수 내림차순 정렬
+    """
+    n = tfidf_matrix.shape[0]
+    k = max(min(top_k, n - 1), 0)
+    neighbor_ids = np.empty((n, k), dtype=np.int32)
+    neighbor_scores = np.empty((n, k), dtype=np.float32)
+    if k == 0:
+        return neighbor_ids, neighbor_scores
+
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        block = linear_kernel(tfidf_matrix[start:stop], tfidf_matrix)
+
+        # 자기 자신은 이웃에서 제외
+        block[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+        neighbor_ids[start:stop], neighbor_scores[start:stop] = top_k_per_row(block, k)
+
+    return neighbor_ids, neighbor_scores
+
+
+def behavioral_edges(pairs, half_life_days: float = BEHAVIOR_HALF_LIFE_DAYS):
+    """
+    행동 데이터 (title_1 → title_2, date) 쌍을 양방향 간선으로 펼치고, 같은 쌍끼리 가중치를 합칩니다.
+    - 쌍 하나의 가중치는 최근 추천일수록 큼: 0.5 ** (가장 최근 날짜와의 차이(일) / half_life_days)
+    - 날짜가 없으면 가중치 1
+    반환: title_1, title_2, weight 컬럼의 DataFrame (자기 자신과의 쌍은 제외)
+    """
+    if len(pairs) == 0:
+        return pd.DataFrame({'title_1': [], 'title_2': [], 'weight': []})
+
+    dates = pd.to_datetime(pairs['date'], utc=True, errors='coerce') if 'date' in pairs else pd.Series(pd.NaT, index=pairs.index)
+    age_days = (dates.max() - dates).dt.total_seconds() / 86400
+    weight = np.power(0.5, age_days / half_life_days).fillna(1.0) if half_life_days > 0 else pd.Series(1.0, index=pairs.index)
+
+    forward = pd.DataFrame({'title_1': pairs['title_1'], 'title_2': pairs['title_2'], 'weight': weight})
+    backward = pd.DataFrame({'title_1': pairs['title_2'], 'title_2': pairs['title_1'], 'weight': weight})
+    edges = pd.concat([forward, backward], ignore_index=True)
+    edges = edges[edges['title_1'] != edges['title_2']].dropna(subset=['title_1', 'title_2'])
+    return edges.groupby(['title_1', 'title_2'], sort=False, as_index=False)['weight'].sum()
+
+
+def build_behavioral_matrix(pairs, half_life_days: float = BEHAVIOR_HALF_LIFE_DAYS):
+    """
+    행동 데이터로 '제목 × 제목' 공동 추천 가중치 희소 행렬(CSR, 대칭)을 만듭니다.
+    반환: (행렬, 행/열 번호 순서의 제목 배열)
+    """
+    edges = behavioral_edges(pairs, half_life_days)
+    codes, titles = pd.factorize(pd.concat([edges['title_1'], edges['title_2']], ignore_index=True))
+    rows, cols = codes[:len(edges)], codes[len(edges):]
+    matrix = sparse.csr_matrix(
+        (edges['weight'].to_numpy(dtype=np.float64), (rows, cols)), shape=(len(titles), len(titles))
+    )
+    return matrix, np.asarray(titles, dtype=object)
+
+
+def build_behavioral_map(matrix, titles):
+    """
+    공동 추천 행렬로 '제목 → 함께 추천된 제목 리스트(가중치 내림차순)' 맵을 만듭니다.
     """
-    모든 데이터 파일에서 콘텐츠 및 행동 기반 모델을 로드하고 반환합니다.
+    matrix = matrix.tocsr()
+    row_of_entry = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+    # 행 번호 오름차순, 같은 행 안에서는 가중치 내림차순 (동점이면 열 번호 순)
+    order = np.lexsort((matrix.indices, -matrix.data, row_of_entry))
+    ranked_titles = titles[matrix.indices[order]].tolist()
+    return {
+        titles[row]: ranked_titles[matrix.indptr[row]:matrix.indptr[row + 1]]
+        for row in range(matrix.shape[0])
+        if matrix.indptr[row + 1] > matrix.indptr[row]
+    }
+
+
+def build_behavioral_ids(pairs):
+    """
+    행동 데이터에 나온 제목 → mal_id 맵을 만듭니다. (카탈로그에 없는 추천 제목의 ID를 찾을 때 사용)
+    (숫자가 아니거나 비어 있는 ID는 건너뜀)
+    """
+    behavioral_ids = {}
+    for title_column, id_column in (('title_2', 'id_2'), ('title_1', 'id_1')):
+        ids = pd.to_numeric(pairs[id_column], errors='coerce')
+        valid = ids.notna()
+        behavioral_ids.update(zip(pairs.loc[valid, title_column], ids[valid].astype('int64')))
+    return {title: int(mal_id) for title, mal_id in behavioral_ids.items()}
+
+
+def attach_derived(data):
+    """
+    저장하지 않고 로드 시점에 바로 만들 수 있는 인덱스(제목/ID 인덱스, 행동 맵)를 채웁니다.
+    """
+    df = data['df']
+    # 같은 제목/ID가 여러 행이면 첫 번째 행만 남겨서, 조회 결과가 항상 행 번호 하나가 되게 함
+    indices = pd.Series(df.index, index=df['title'])
+    data['indices'] = indices[~indices.index.duplicated()]
+    id_indices = pd.Series(df.index, index=df['anime_id'])
+    data['id_indices'] = id_indices[~id_indices.index.duplicated()]
+    data['behavioral_matrix'], data['behavioral_titles'] = build_behavioral_matrix(data['behavioral_pairs'])
+    data['behavioral_map'] = build_behavioral_map(data['behavioral_matrix'], data['behavioral_titles'])
+    data['behavioral_ids'] = build_behavioral_ids(data['behavioral_pairs'])
+    return data
+
+
+def clean_text(text):
+    return str(text).lower().replace('|', ' ') if pd.notna(text) else ''
+
+
+def make_soup(df):
+    """TF-IDF 입력 문서: 줄거리 + 장르"""
+    return (df['synopsis'] + ' ' + df['genres']).apply(clean_text)
+
+
+def build_all_models():
+    """
+    원본 CSV 파일에서 콘텐츠 및 행동 기반 모델을 새로 학습하여 반환합니다.
     """
     data = {
         'df': None,
         'cosine_sim': None,
-        'indices': None,
-        'behavioral_map': {}
+        'neighbor_ids': None,
+        'neighbor_scores': None,
+        'tfidf_matrix': None,
+        'vectorizer': None,
+        'behavioral_pairs': pd.DataFrame(columns=['title_1', 'id_1', 'title_2', 'id_2', 'date']),
     }
-    NO_IMAGE_URL = "../images/no_img.png"
-
     # 1. 콘텐츠 기반 모델 로드 (anime-dataset-2023.csv)
     try:
-        df = pd.read_csv('../csv/anime-dataset-2023.csv')
+        df = pd.read_csv(CATALOG_CSV)
         df.rename(columns={'Name': 'title', 'Synopsis': 'synopsis', 'Genres': 'genres', 'Image URL': 'image_url'}, inplace=True)
         df.dropna(subset=['title', 'synopsis', 'genres',], inplace=True)
         df['image_url'] = df['image_url'].fillna(NO_IMAGE_URL)
@@ -27,18 +201,16 @@ def load_all_models():
         df['synopsis'] = df['synopsis'].fillna('')
         df['genres'] = df['genres'].fillna('')
 
-        def clean_text(text):
-            return str(text).lower().replace('|', ' ') if pd.notna(text) else ''
-
-        df['soup'] = (df['synopsis'] + ' ' + df['genres']) 
-        df['soup'] = df['soup'].apply(clean_text)
-
-        tfidf = TfidfVectorizer(max_features=5000, stop_words='english', ngram_range=(1, 2), min_df=2,)
-        tfidf_matrix = tfidf.fit_transform(df['soup'])
+        tfidf = TfidfVectorizer(**TFIDF_PARAMS)
+        tfidf_matrix = tfidf.fit_transform(make_soup(df))
         
         data['df'] = df
-        data['cosine_sim'] = linear_kernel(tfidf_matrix, tfidf_matrix)
-        data['indices'] = pd.Series(df.index, index=df['title']).drop_duplicates()
+        data['tfidf_matrix'] = tfidf_matrix
+        data['vectorizer'] = tfidf
+        if SIMILARITY_MODE == "dense":
+            data['cosine_sim'] = linear_kernel(tfidf_matrix, tfidf_matrix)
+        else:
+            data['neighbor_ids'], data['neighbor_scores'] = build_neighbor_index(tfidf_matrix)
         print("   ✓ 콘텐츠 기반 모델 생성 완료.")
     
     except Exception as e:
@@ -47,21 +219,175 @@ def load_all_models():
 
     # 2. 행동 기반 모델 로드 (recommend_anime_5000.csv)
     try:
-        df_rec = pd.read_csv('../csv/recommend_anime_5000.csv')
-        
-        for index, row in df_rec.iterrows():
-            title_1 = row['Anime_1_Title']
-            title_2 = row['Anime_2_Title']
-            
-            if title_1 not in data['behavioral_map']:
-                data['behavioral_map'][title_1] = set()
-            data['behavioral_map'][title_1].add(title_2)
-
-        for key in data['behavioral_map']:
-            data['behavioral_map'][key] = list(data['behavioral_map'][key])
+        df_rec = pd.read_csv(BEHAVIOR_CSV, encoding='utf-8-sig')
+        if 'Date' not in df_rec.columns:
+            df_rec['Date'] = None
+        pairs = df_rec[['Anime_1_Title', 'Anime_1_ID', 'Anime_2_Title', 'Anime_2_ID', 'Date']].rename(
+            columns={'Anime_1_Title': 'title_1', 'Anime_1_ID': 'id_1', 'Anime_2_Title': 'title_2', 'Anime_2_ID': 'id_2', 'Date': 'date'}
+        )
+        # 같은 쌍이 여러 번 나온 기록도 그대로 둠 (횟수와 날짜가 가중치에 반영됨 - behavioral_edges 참고)
+        pairs['date'] = pd.to_datetime(pairs['date'], utc=True, errors='coerce')
+        data['behavioral_pairs'] = pairs.reset_index(drop=True)
         print("   ✓ 행동 기반 맵 생성 완료.")
 
     except Exception as e:
         print(f"❌ 행동 모델 오류: {e}")
 
-    return data
\ No newline at end of file
+    return data
+
+
+def restore_vectorizer(vocabulary, idf):
+    """
+    저장된 어휘(vocabulary)와 idf 가중치로 학습된 상태의 TfidfVectorizer를 복원합니다.
+    """
+    tfidf = TfidfVectorizer(**TFIDF_PARAMS, vocabulary={term: i for i, term in enumerate(vocabulary)})
+    tfidf.idf_ = idf
+    return tfidf
+
+
+def load_all_models(force_rebuild: bool = False):
+    """
+    저장된 모델 아티팩트를 로드합니다.
+    원본 CSV의 체크섬이 바뀌었거나 아티팩트가 없으면 새로 학습한 뒤 저장합니다.
+    """
+    checksum = model_store.source_checksum([CATALOG_CSV, BEHAVIOR_CSV])
+
+    if not force_rebuild:
+        data = _load_latest(checksum)
+        if data is not None:
+            return data
+
+    # 여러 워커가 동시에 시작하거나 원본 변경을 감지해도 학습은 한 프로세스만 하고,
+    # 락을 기다린 나머지는 그 결과를 로드
+    requested_at = datetime.now(timezone.utc)
+    with model_store.build_lock():
+        data = _load_latest(checksum, built_after=requested_at if force_rebuild else None)
+        if data is not None:
+            return data
+        return _build_and_save(checksum)
+
+
+def _build_and_save(checksum: str):
+    data = build_all_models()
+    if data is None:
+        return None
+
+    try:
+        version = model_store.save_artifacts(data, checksum, similarity_mode=SIMILARITY_MODE, settings=model_settings())
+        print(f"   ✓ 모델 아티팩트 저장 완료. (version: {version})")
+    except Exception as e:
+        # 저장에 실패해도 메모리에 만든 모델로는 서비스할 수 있음
+        print(f"⚠️ 모델 아티팩트 저장 실패: {e}")
+        data['version'] = checksum[:12]
+        return attach_derived(data)
+
+    # 방금 저장한 아티팩트를 다시 열어서, 학습에 쓴 배열 대신 memmap 배열을 쓰게 함
+    return _load_latest(checksum) or attach_derived({**data, 'version': version})
+
+
+def _load_latest(checksum: str, built_after=None):
+    data = model_store.load_latest(
+        checksum, similarity_mode=SIMILARITY_MODE, built_after=built_after, settings=model_settings()
+    )
+    if data is None:
+        return None
+    data['vectorizer'] = restore_vectorizer(data.pop('vocabulary'), data.pop('idf'))
+    print(f"   ✓ 모델 아티팩트 로드 완료. (version: {data['version']})")
+    return attach_derived(data)
+
+
+def normalize_new_titles(new_titles, df):
+    """
+    신작 목록을 카탈로그 컬럼 형식으로 바꾸고, 이미 카탈로그에 있는 anime_id와 필수 값이 없는 행은 뺍니다.
+    """
+    new_df = new_titles.rename(columns=NEW_TITLE_COLUMNS)
+    new_df = new_df[[column for column in df.columns if column in new_df.columns]]
+    new_df = new_df.dropna(subset=['anime_id', 'title', 'synopsis', 'genres'])
+    new_df = new_df.astype({'anime_id': df['anime_id'].dtype})
+    new_df = new_df[~new_df['anime_id'].isin(df['anime_id'])].drop_duplicates(subset=['anime_id'])
+    new_df['image_url'] = new_df['image_url'].fillna(NO_IMAGE_URL) if 'image_url' in new_df else NO_IMAGE_URL
+
+    # 카탈로그에서 문자열인 컬럼(예: Score에 'UNKNOWN'이 섞여 있음)은 신작 값도 문자열로 맞춤 (parquet 저장용)
+    #   pandas 3부터 문자열 컬럼은 object가 아니라 str dtype이므로 둘 다 확인
+    for column in new_df.columns:
+        if pd.api.types.is_string_dtype(df[column]) or pd.api.types.is_object_dtype(df[column]):
+            new_df[column] = new_df[column].map(lambda value: value if pd.isna(value) else str(value)).astype(df[column].dtype)
+    return new_df.reindex(columns=df.columns).reset_index(drop=True)
+
+
+def add_catalog_rows(data, new_titles):
+    """
+    TF-IDF를 다시 학습하지 않고 신작을 모델에 추가한 새 model_data를 반환합니다.
+    - 신작 문서만 기존 어휘(vocabulary)/idf로 벡터화
+    - 신작 행의 이웃만 새로 계산하고, 기존 행은 신작이 자기 상위 K에 들어오는 행만 이웃 목록을 고침
+    (data는 바꾸지 않음. 추가할 신작이 없으면 None)
+    """
+    df = data['df']
+    new_df = normalize_new_titles(new_titles, df)
+    if new_df.empty:
+        return None
+
+    n_old, n_new = len(df), len(new_df)
+    new_matrix = data['vectorizer'].transform(make_soup(new_df))
+    tfidf_matrix = sparse.vstack([data['tfidf_matrix'], new_matrix], format='csr')
+
+    # 신작 행과 전체 행의 유사도 (n_new × 전체), 자기 자신은 제외
+    block = linear_kernel(new_matrix, tfidf_matrix)
+    block[np.arange(n_new), n_old + np.arange(n_new)] = -np.inf
+
+    new_data = {**data, 'df': pd.concat([df, new_df], ignore_index=True), 'tfidf_matrix': tfidf_matrix}
+    if data['cosine_sim'] is not None:
+        cross = np.nan_to_num(block, neginf=0.0)
+        new_data['cosine_sim'] = np.block([
+            [np.asarray(data['cosine_sim']), cross[:, :n_old].T],
+            [cross[:, :n_old], cross[:, n_old:] + np.eye(n_new)],
+        ])
+        return new_data
+
+    neighbor_ids = np.array(data['neighbor_ids'])
+    neighbor_scores = np.array(data['neighbor_scores'])
+    k = neighbor_ids.shape[1]
+    if k == 0:
+        new_data['neighbor_ids'], new_data['neighbor_scores'] = build_neighbor_index(tfidf_matrix)
+        return new_data
+
+    # 1. 신작 행의 이웃 (k는 기존 카탈로그 크기보다 작으므로 항상 k개가 채워짐)
+    added_ids, added_scores = top_k_per_row(block, k)
+
+    # 2. 신작이 기존 상위 K의 마지막 점수보다 높은 기존 행만 이웃 목록을 다시 고름
+    cross = block[:, :n_old].T  # (n_old × n_new)
+    affected = np.flatnonzero(cross.max(axis=1) > neighbor_scores[:, -1])
+    if len(affected):
+        candidate_ids = np.hstack([neighbor_ids[affected], np.broadcast_to(n_old + np.arange(n_new), (len(affected), n_new))])
+        candidate_scores = np.hstack([neighbor_scores[affected], cross[affected]])
+        positions, patched_scores = top_k_per_row(candidate_scores, k)
+        neighbor_ids[affected] = np.take_along_axis(candidate_ids, positions, axis=1)
+        neighbor_scores[affected] = patched_scores
+
+    new_data['neighbor_ids'] = np.vstack([neighbor_ids, added_ids]).astype(np.int32)
+    new_data['neighbor_scores'] = np.vstack([neighbor_scores, added_scores]).astype(np.float32)
+    print(f"   ✓ 신작 {n_new}개 추가, 이웃 목록이 바뀐 기존 작품 {len(affected)}개.")
+    return new_data
+
+
+def add_titles_from_csv(data, path: str = NEW_TITLES_CSV):
+    """
+    CSV의 신작을 모델에 추가하고, 새 버전으로 저장한 뒤 (memmap으로 다시 연) model_data를 반환합니다.
+    새 버전은 같은 원본 체크섬으로 저장되므로 재시작해도 유지되고, 원본 CSV가 바뀌어 전체 재학습하면 사라집니다.
+    (추가할 신작이 없으면 None)
+    """
+    new_titles = pd.read_csv(path, encoding='utf-8-sig')
+    new_data = add_catalog_rows(data, new_titles)
+    if new_data is None:
+        return None
+
+    checksum = model_store.source_checksum([CATALOG_CSV, BEHAVIOR_CSV])
+    added_ids = new_data['df']['anime_id'].iloc[len(data['df']):].astype(str)
+    digest = hashlib.sha256(f"{data['version']}:{','.join(added_ids)}".encode("utf-8")).hexdigest()
+    with model_store.build_lock():
+        version = model_store.save_artifacts(
+            new_data, checksum, similarity_mode=SIMILARITY_MODE,
+            version=f"{checksum[:12]}-{digest[:8]}", base_version=data['version'], settings=model_settings(),
+        )
+    print(f"   ✓ 신작 추가 모델 저장 완료. (version: {version})")
+    return _load_latest(checksum) or attach_derived({**new_data, 'version': version})
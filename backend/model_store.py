@@ -0,0 +1,234 @@
+# model_store.py
+
+import os
+import json
+import fcntl
+import shutil
+import hashlib
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# 모델 아티팩트를 저장할 루트 폴더 (버전별 하위 폴더 + 현재 버전을 가리키는 LATEST 파일)
+ARTIFACT_ROOT = os.getenv("MODEL_ARTIFACT_DIR", "../artifacts")
+# 저장 형식이 바뀌면 올려서 예전 아티팩트를 자동으로 무시하게 함
+ARTIFACT_FORMAT = 4
+# 큰 배열(유사도/이웃/TF-IDF)은 numpy.memmap으로 열어서, 같은 호스트의 모든 워커가
+# 페이지 캐시에 올라간 읽기 전용 사본 하나를 함께 쓰게 함 ("0"이면 메모리로 복사해서 로드)
+USE_MMAP = os.getenv("MODEL_MMAP", "1") != "0"
+
+
+def source_checksum(paths):
+    """
+    원본 CSV 파일들의 내용을 합친 sha256 체크섬을 계산합니다. (없는 파일은 건너뜀)
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        digest.update(os.path.basename(path).encode("utf-8"))
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+@contextmanager
+def build_lock():
+    """
+    ARTIFACT_ROOT의 파일 락(flock)을 잡습니다. 여러 워커/프로세스가 동시에 같은 모델을 학습하거나
+    서로의 버전 폴더를 지우지 않도록, 아티팩트를 만들고 저장하는 동안 한 프로세스씩 실행합니다.
+    """
+    os.makedirs(ARTIFACT_ROOT, exist_ok=True)
+    with open(os.path.join(ARTIFACT_ROOT, ".build.lock"), "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _write_latest(version: str):
+    # LATEST 파일은 임시 파일에 쓴 뒤 교체하여, 읽는 쪽이 절반만 쓰인 내용을 보지 않게 함
+    tmp_path = os.path.join(ARTIFACT_ROOT, f"LATEST.tmp{os.getpid()}")
+    with open(tmp_path, "w") as f:
+        f.write(version)
+    os.replace(tmp_path, os.path.join(ARTIFACT_ROOT, "LATEST"))
+
+
+def save_artifacts(data: dict, checksum: str, similarity_mode: str,
+                   version: str | None = None, base_version: str | None = None, settings: dict | None = None):
+    """
+    학습된 모델(카탈로그, 어휘, TF-IDF 행렬, 유사도/이웃, 행동 쌍)을 버전 폴더에 저장하고
+    LATEST가 그 버전을 가리키게 한 뒤, 필요 없어진 예전 버전 폴더를 지웁니다. 저장된 버전 문자열을 반환합니다.
+    (version을 주지 않으면 원본 체크섬 앞 12자리, base_version은 신작 추가 전 버전,
+     settings는 모델을 만든 설정 - 바뀌면 load_latest가 다시 만들게 함)
+    """
+    version = version or checksum[:12]
+    version_dir = os.path.join(ARTIFACT_ROOT, version)
+    tmp_dir = f"{version_dir}.tmp{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    try:
+        data['df'].to_parquet(os.path.join(tmp_dir, "catalog.parquet"), index=False)
+        data['behavioral_pairs'].to_parquet(os.path.join(tmp_dir, "behavioral.parquet"), index=False)
+
+        vectorizer = data['vectorizer']
+        vocabulary = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+        np.save(os.path.join(tmp_dir, "vocabulary.npy"), np.array(vocabulary, dtype=str))
+        np.save(os.path.join(tmp_dir, "idf.npy"), vectorizer.idf_)
+        _save_csr(tmp_dir, "tfidf", data['tfidf_matrix'])
+
+        if data['cosine_sim'] is not None:
+            np.save(os.path.join(tmp_dir, "cosine_sim.npy"), data['cosine_sim'])
+        else:
+            np.save(os.path.join(tmp_dir, "neighbor_ids.npy"), data['neighbor_ids'])
+            np.save(os.path.join(tmp_dir, "neighbor_scores.npy"), data['neighbor_scores'])
+
+        manifest = {
+            "version": version,
+            "format": ARTIFACT_FORMAT,
+            "source_checksum": checksum,
+            "similarity_mode": similarity_mode,
+            "settings": _normalize_settings(settings),
+            "base_version": base_version,
+            "n_titles": int(len(data['df'])),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+        with open(os.path.join(tmp_dir, "manifest.json"), "w") as f:
+            json.dump(manifest, f, indent=2)
+    except Exception:
+        # 쓰다가 실패하면 임시 폴더를 남기지 않음
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    # 다 쓴 뒤에 폴더 이름을 바꿔서, 중간에 실패한 아티팩트가 로드되지 않게 함
+    #   같은 이름의 예전 폴더는 다른 워커가 memmap으로 열어 두었을 수 있으므로 지우지 않고 옆으로 옮김
+    #   (열린 파일은 이름이 바뀌어도 그대로 읽힘)
+    if os.path.exists(version_dir):
+        os.replace(version_dir, f"{version_dir}.old{os.getpid()}-{int(datetime.now().timestamp())}")
+    os.replace(tmp_dir, version_dir)
+    _write_latest(version)
+    prune_versions(keep={version, base_version})
+    return version
+
+
+def prune_versions(keep):
+    """
+    keep(LATEST와 그 신작 추가 전 버전) 외의 버전 폴더와 옆으로 옮겨 둔 예전 폴더를 지웁니다. (build_lock 안에서 호출)
+    다른 워커가 memmap으로 열어 둔 파일은 지워져도 그 워커가 닫을 때까지 읽을 수 있고,
+    지우는 중에 예전 버전을 열던 워커는 로드에 실패한 뒤 LATEST를 다시 읽습니다.
+    """
+    for name in os.listdir(ARTIFACT_ROOT):
+        path = os.path.join(ARTIFACT_ROOT, name)
+        if name in keep or not os.path.isdir(path):
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        print(f"   ✓ 예전 모델 아티팩트 삭제: {name}")
+
+
+def _normalize_settings(settings):
+    # JSON으로 저장했다 읽은 값과 비교할 수 있도록 (tuple → list 등) 같은 형태로 맞춤
+    return json.loads(json.dumps(settings or {}, sort_keys=True))
+
+
+def _save_csr(directory: str, name: str, matrix):
+    # npz(zip)는 memmap으로 열 수 없으므로 CSR 구성 배열을 각각 .npy로 저장
+    matrix = matrix.tocsr()
+    np.save(os.path.join(directory, f"{name}_data.npy"), matrix.data.astype(np.float32))
+    np.save(os.path.join(directory, f"{name}_indices.npy"), matrix.indices.astype(np.int32))
+    np.save(os.path.join(directory, f"{name}_indptr.npy"), matrix.indptr.astype(np.int64))
+    np.save(os.path.join(directory, f"{name}_shape.npy"), np.array(matrix.shape, dtype=np.int64))
+
+
+def _load_array(path: str):
+    return np.load(path, mmap_mode="r" if USE_MMAP else None)
+
+
+def _load_csr(directory: str, name: str):
+    # copy=False: memmap 배열을 그대로 참조하는 CSR 행렬을 만듦
+    return sparse.csr_matrix(
+        (
+            _load_array(os.path.join(directory, f"{name}_data.npy")),
+            _load_array(os.path.join(directory, f"{name}_indices.npy")),
+            _load_array(os.path.join(directory, f"{name}_indptr.npy")),
+        ),
+        shape=tuple(int(x) for x in np.load(os.path.join(directory, f"{name}_shape.npy"))),
+        copy=False,
+    )
+
+
+def read_manifest(version: str):
+    path = os.path.join(ARTIFACT_ROOT, version, "manifest.json")
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def latest_version():
+    path = os.path.join(ARTIFACT_ROOT, "LATEST")
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return f.read().strip() or None
+
+
+def load_artifacts(version: str):
+    """
+    버전 폴더의 아티팩트를 읽어 load_all_models()와 같은 형태의 딕셔너리로 반환합니다.
+    """
+    version_dir = os.path.join(ARTIFACT_ROOT, version)
+    manifest = read_manifest(version)
+
+    data = {
+        'version': manifest['version'],
+        'df': pd.read_parquet(os.path.join(version_dir, "catalog.parquet")),
+        'behavioral_pairs': pd.read_parquet(os.path.join(version_dir, "behavioral.parquet")),
+        'vocabulary': np.load(os.path.join(version_dir, "vocabulary.npy")).tolist(),
+        'idf': np.load(os.path.join(version_dir, "idf.npy")),
+        'tfidf_matrix': _load_csr(version_dir, "tfidf"),
+        'cosine_sim': None,
+        'neighbor_ids': None,
+        'neighbor_scores': None,
+    }
+    if manifest['similarity_mode'] == "dense":
+        data['cosine_sim'] = _load_array(os.path.join(version_dir, "cosine_sim.npy"))
+    else:
+        data['neighbor_ids'] = _load_array(os.path.join(version_dir, "neighbor_ids.npy"))
+        data['neighbor_scores'] = _load_array(os.path.join(version_dir, "neighbor_scores.npy"))
+    return data
+
+
+def load_latest(checksum: str, similarity_mode: str, built_after: datetime | None = None, settings: dict | None = None):
+    """
+    LATEST 아티팩트가 현재 원본 CSV(checksum)와 설정으로 만든 것이면 로드하고,
+    아니면(없거나 오래됐거나 읽기 실패) None을 반환합니다.
+    (built_after를 주면 그 이후에 만들어진 아티팩트만 로드 - 다른 프로세스가 방금 강제로 다시 만든 경우)
+    """
+    version = latest_version()
+    if version is None:
+        return None
+
+    manifest = read_manifest(version)
+    if (
+        manifest is None
+        or manifest.get("format") != ARTIFACT_FORMAT
+        or manifest.get("source_checksum") != checksum
+        or manifest.get("similarity_mode") != similarity_mode
+        or manifest.get("settings") != _normalize_settings(settings)
+    ):
+        print("   ↻ 원본 데이터나 모델 설정이 바뀌어 모델을 다시 생성합니다.")
+        return None
+    if built_after is not None and datetime.fromisoformat(manifest["created_at"]) < built_after:
+        return None
+
+    try:
+        return load_artifacts(version)
+    except Exception as e:
+        print(f"⚠️ 모델 아티팩트 로드 실패 ({version}): {e}")
+        return None
@@ -0,0 +1,113 @@
+# password_hashing.py
+#
+# bcrypt 해시/검증을 요청 처리 스레드가 아닌 전용 프로세스 풀에서 실행합니다.
+# - bcrypt는 일부러 느리게(CPU를 많이 쓰게) 만든 알고리즘이라, 이벤트 루프나 FastAPI 스레드풀에서 돌리면
+#   로그인이 몰릴 때 다른 API까지 느려지고, GIL 때문에 스레드를 늘려도 코어를 다 쓰지 못합니다.
+# - 풀에 쌓인 작업이 PASSWORD_HASH_MAX_PENDING개를 넘으면 기다리게 하지 않고 바로 503을 반환합니다.
+#
+# 환경 변수
+#   BCRYPT_ROUNDS               bcrypt cost (기본값: 12). 바꾸면 기존 해시는 다음 로그인 때 새 cost로 다시 저장됨
+#   PASSWORD_HASH_WORKERS       웹 워커 하나가 쓰는 해시 전용 프로세스 수 (기본값: CPU 코어 수 ÷ WEB_CONCURRENCY, 최소 1)
+#   PASSWORD_HASH_MAX_PENDING   웹 워커 하나에서 동시에 처리/대기할 수 있는 해시 작업 수 (기본값: 해시 프로세스 수 × 4)
+#
+# 풀과 대기 한도는 웹 워커(serve.py의 WEB_CONCURRENCY)마다 따로 잡히므로, 호스트 전체로는
+#   해시 프로세스 = WEB_CONCURRENCY × PASSWORD_HASH_WORKERS, 대기 한도 = WEB_CONCURRENCY × PASSWORD_HASH_MAX_PENDING
+# 입니다. 기본값은 해시 프로세스 합계가 CPU 코어 수 정도가 되도록 나눕니다. 두 값을 바꿀 때는 함께 맞출 것.
+
+import os
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# 이 호스트의 웹 워커 수 (serve.py가 설정, uvicorn 단일 프로세스로 띄우면 1)
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(max(1, (os.cpu_count() or 1) // WEB_CONCURRENCY))))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", str(PASSWORD_HASH_WORKERS * 4)))
+# 풀이 가득 찼을 때 503 응답에 넣을 Retry-After(초)
+PASSWORD_HASH_RETRY_AFTER = os.getenv("PASSWORD_HASH_RETRY_AFTER", "1")
+
+# 암호화 방식 설정 (bcrypt 사용, cost가 설정값과 다른 해시는 needs_update 대상)
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+_executor = None
+_pending = 0
+
+
+def _truncate(password: str) -> str:
+    # bcrypt는 앞 72바이트만 사용하므로 미리 잘라서 넘김 (해시/검증 모두 같은 규칙)
+    if len(password.encode("utf-8")) > 72:
+        password = password.encode("utf-8")[:72].decode("utf-8", errors="ignore")
+    return password
+
+
+# --- 워커 프로세스에서 실행되는 함수 (pickle 가능하도록 모듈 최상위에 둠) ---
+def hash_password_sync(password: str) -> str:
+    return pwd_context.hash(_truncate(password))
+
+
+def verify_password_sync(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(_truncate(plain_password), hashed_password)
+
+
+def verify_and_update_sync(plain_password: str, hashed_password: str):
+    """(비밀번호 일치 여부, cost가 바뀌었으면 새 해시 / 아니면 None)"""
+    return pwd_context.verify_and_update(_truncate(plain_password), hashed_password)
+
+
+# --- 요청 처리 쪽 (async) ---
+def get_executor():
+    global _executor
+    if _executor is None:
+        # spawn: 모델 재로드 스레드 등이 있는 서버 프로세스를 fork하지 않고 새 인터프리터로 시작
+        _executor = ProcessPoolExecutor(
+            max_workers=PASSWORD_HASH_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def _run(func, *args):
+    global _pending
+    if _pending >= PASSWORD_HASH_MAX_PENDING:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="요청이 많아 잠시 후 다시 시도해 주세요.",
+            headers={"Retry-After": PASSWORD_HASH_RETRY_AFTER},
+        )
+    _pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(get_executor(), func, *args)
+    finally:
+        _pending -= 1
+
+
+async def hash_password(password: str) -> str:
+    return await _run(hash_password_sync, password)
+
+
+async def verify_and_update(plain_password: str, hashed_password: str):
+    """
+    비밀번호를 검증하고 (일치 여부, 새 해시 또는 None)을 반환합니다.
+    새 해시가 있으면 저장된 해시의 cost가 BCRYPT_ROUNDS와 다른 것이므로 DB에 다시 저장하면 됩니다.
+    """
+    return await _run(verify_and_update_sync, plain_password, hashed_password)
+
+
+def stats():
+    return {
+        "workers": PASSWORD_HASH_WORKERS,
+        "web_concurrency": WEB_CONCURRENCY,
+        "max_pending": PASSWORD_HASH_MAX_PENDING,
+        "pending": _pending,
+        "rounds": BCRYPT_ROUNDS,
+    }
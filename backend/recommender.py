@@ -1,17 +1,83 @@
 # recommender.py
 
-from model_loader import load_all_models
-from jikan_client import fetch_anime_details
+from model_loader import load_all_models, top_k_per_row, NO_IMAGE_URL
+from jikan_client import fetch_candidate_details, peek_cached_details, MISSING
+from singleflight import SingleFlight
+from cache import TTLCache
+from search_index import TitleSearchIndex, AutocompleteIndex, catalog_names
+from browse_index import CatalogBrowseIndex
+from functools import lru_cache
 from fastapi import HTTPException
+import os
 import asyncio
+import numpy as np
+import pandas as pd
+from sklearn.metrics.pairwise import linear_kernel
+from scipy import sparse
+
+# 추천 결과 정보 보강 방식
+#   "local": 로드된 카탈로그로 바로 응답하고, Jikan 정보는 백그라운드에서 갱신
+#   "remote": 모든 추천 결과를 Jikan API로 조회 (예전 방식)
+ENRICHMENT_MODE = os.getenv("ENRICHMENT_MODE", "local")
+# 카탈로그 값 대신 캐시된 Jikan 값(최신)을 쓰는 필드
+REFRESHABLE_FIELDS = ("image_url", "score")
+# 카탈로그 값이 있어도 Jikan 캐시가 없거나 만료됐으면(JIKAN_CACHE_TTL) 백그라운드에서 다시 조회할지 ("0"이면 빈 필드만 조회)
+REFRESH_STALE_DETAILS = os.getenv("REFRESH_STALE_DETAILS", "1") != "0"
+# 위 갱신(응답을 기다리지 않는 갱신)을 동시에 최대 몇 개까지 예약할지 (Jikan 요청 한도를 빈 필드 조회에 남겨 두기 위함)
+STALE_REFRESH_MAX_PENDING = int(os.getenv("STALE_REFRESH_MAX_PENDING", "50"))
+
+# /animes/recommend 응답 캐시 (키: 모델 버전 + top_n + 제목)
+#   RESULT_CACHE_DB를 지정하면 SQLite 파일에도 저장하여 재시작 후에도 유지됨
+result_cache = TTLCache(
+    max_entries=int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "5000")),
+    ttl=float(os.getenv("RESULT_CACHE_TTL", "3600")),
+    negative_ttl=float(os.getenv("RESULT_CACHE_NEGATIVE_TTL", "60")),
+    sqlite_path=os.getenv("RESULT_CACHE_DB") or None,
+    namespace="recommend",
+)
+
+# /users/me/recommendations 응답 캐시 (키: 모델 버전 + 사용자 + 즐겨찾기 버전 + top_n)
+#   즐겨찾기 버전 = (개수, 가장 큰 id). id는 계속 증가하므로 추가/삭제하면 버전이 바뀌어 예전 결과는 쓰이지 않음
+user_result_cache = TTLCache(
+    max_entries=int(os.getenv("USER_RESULT_CACHE_MAX_ENTRIES", "10000")),
+    ttl=float(os.getenv("USER_RESULT_CACHE_TTL", "3600")),
+    namespace="user_recommend",
+)
+
+
+def top_k_indices(scores, k: int, exclude=()):
+    """
+    점수 배열에서 exclude를 뺀 상위 k개의 위치를 점수 내림차순(동점이면 위치 오름차순)으로 반환합니다.
+    전체를 정렬하지 않고 argpartition으로 k개만 고른 뒤, 그 k개만 정렬합니다.
+    """
+    scores = np.array(scores, dtype=np.float32).ravel()
+    if len(exclude):
+        scores[np.asarray(exclude)] = -np.inf
+    k = min(k, len(scores) - len(exclude))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+
+    part = np.argpartition(-scores, k - 1)[:k]
+    return part[np.lexsort((part, -scores[part]))]
+
 
 class RecommenderService:
     """
     추천 모델을 관리하고 API 로직을 실행하는 서비스 레이어
     """
-    def __init__(self):
+    @classmethod
+    def not_loaded(cls):
+        """모델 없이 만든 빈 서비스 (서버 시작 직후, 모델이 로드되기 전까지 자리를 채움)"""
+        service = cls.__new__(cls)
+        service.is_loaded = False
+        service.df = None
+        service.model_version = None
+        return service
+
+    def __init__(self, model_data: dict | None = None, force_rebuild: bool = False):
         print("🚀 Recommender Service 초기화...")
-        model_data = load_all_models()
+        if model_data is None:
+            model_data = load_all_models(force_rebuild=force_rebuild)
         
         if model_data is None:
             self.is_loaded = False
@@ -19,32 +85,87 @@ class RecommenderService:
             return
 
         # 모델 로드 성공 시, 모든 데이터를 클래스 속성으로 저장
+        self.model_data = model_data
         self.df = model_data['df']
         self.cosine_sim = model_data['cosine_sim']
+        self.neighbor_ids = model_data['neighbor_ids']
+        self.neighbor_scores = model_data['neighbor_scores']
+        self.tfidf_matrix = model_data['tfidf_matrix']
         self.indices = model_data['indices']
+        self.id_indices = model_data['id_indices']
         self.behavioral_map = model_data['behavioral_map']
+        self.behavioral_ids = model_data['behavioral_ids']
+        self.model_version = model_data['version']
+        score_column = 'Score' if 'Score' in self.df.columns else 'score'
+        self.scores = pd.to_numeric(self.df[score_column], errors='coerce').to_numpy(dtype=np.float64)
+        self.records = self._build_records()
+        names = catalog_names(self.df)
+        self.search_index = TitleSearchIndex(names, self.scores)
+        self.autocomplete_index = AutocompleteIndex(names, self._popularity_weights())
+        self.browse_index = CatalogBrowseIndex(self.df, self.scores)
+        # 타이핑 중에는 같은 접두사가 반복해서 들어오므로 최근 결과를 기억해 둠
+        self._complete_rows = lru_cache(maxsize=4096)(self.autocomplete_index.complete)
+        self._refreshing = set()
+        self._refresh_tasks = set()
+        self.hybrid_flight = SingleFlight()
         self.is_loaded = True
 
 
-    def search_anime_titles(self, keyword: str, top_n: int = 10):
+    def _build_records(self):
         """
-        데이터베이스에서 키워드를 포함하는 애니메이션 제목을 검색합니다.
+        추천 응답에 쓸 필드만 뽑아서, 행 번호로 바로 꺼낼 수 있는 딕셔너리 리스트로 만듭니다.
+        비어 있는 값(점수 없음, 기본 이미지)은 None으로 바꿔서 원격 갱신 대상으로 표시합니다.
+        """
+        records = pd.DataFrame({
+            'title': self.df['title'],
+            'image_url': self.df['image_url'].where(self.df['image_url'] != NO_IMAGE_URL),
+            'score': self.scores,
+            'mal_id': self.df['anime_id'],
+            'genres': self.df['genres'],
+        })
+        records = records.astype(object).where(records.notna(), None)
+        return records.to_dict('records')
+
+
+    def _popularity_weights(self):
+        """
+        자동완성 순위에 쓸 인기도 가중치 (회원 수가 있으면 log(회원 수), 없으면 점수)
+        """
+        if 'Members' in self.df.columns:
+            members = pd.to_numeric(self.df['Members'], errors='coerce').to_numpy(dtype=np.float64)
+            return np.log1p(np.nan_to_num(members, nan=0.0))
+        return np.nan_to_num(self.scores, nan=0.0)
+
+
+    def autocomplete(self, query: str, limit: int = 10):
+        """
+        입력 중인 검색어에 대한 자동완성 후보(anime_id, 제목, 이미지)를 인기도 순으로 반환합니다.
+        (결과가 없으면 빈 리스트)
         """
         if self.df is None:
             return []
 
-        results = self.df[
-            self.df['title'].str.contains(keyword, case=False, na=False)
-        ]
+        suggestions = []
+        for row in self._complete_rows(query, limit):
+            record = self.records[row]
+            suggestions.append({
+                "anime_id": record['mal_id'],
+                "title": record['title'],
+                "image_url": record['image_url'] or NO_IMAGE_URL,
+            })
+        return suggestions
 
-        if not results.empty:
-            # CSV에 score 컬럼이 있다고 가정하고 점수순으로 정렬
-            if 'score' in results.columns:
-                 return results.sort_values(by='score', ascending=False)['title'].head(top_n).tolist()
-            else:
-                 return results['title'].head(top_n).tolist()
-        
-        return []
+
+    def search_anime_titles(self, keyword: str, top_n: int = 10):
+        """
+        제목/영어 제목/일본어 제목에 키워드를 포함하는 애니메이션 제목을 점수순으로 검색합니다.
+        (로드 시 만들어 둔 n-gram 색인을 사용하므로 카탈로그 전체를 훑지 않음)
+        """
+        if self.df is None:
+            return []
+
+        rows = self.search_index.search(keyword, top_n=top_n)
+        return self.df['title'].iloc[rows].tolist()
 
 
     def get_hybrid_recommendations(self, title: str, top_n: int = 20):
@@ -55,74 +176,339 @@ class RecommenderService:
             return None
 
         final_recommendations = []
+        seen = {title}  # 중복 확인은 리스트 대신 set으로 (O(1))
         
         # 1. 행동 기반 추천
         behavioral_recs = self.behavioral_map.get(title, [])
         for rec_title in behavioral_recs:
-            if rec_title != title and rec_title not in final_recommendations:
+            if rec_title not in seen:
+                seen.add(rec_title)
                 final_recommendations.append(rec_title)
 
         # 2. 콘텐츠 기반 추천
         try:
             idx = self.indices[title]
-            sim_scores = sorted(list(enumerate(self.cosine_sim[idx])), key=lambda x: x[1], reverse=True)
-            content_recs = self.df['title'].iloc[[i[0] for i in sim_scores[1:]]].tolist()
-            
-            # 3. 통합 및 중복 제거
-            for rec_title in content_recs:
-                if rec_title not in final_recommendations:
-                    final_recommendations.append(rec_title)
-
-            return final_recommendations[:top_n] 
-
         except KeyError:
             if final_recommendations:
                 return final_recommendations[:top_n]
             return None
 
+        # 3. 통합 및 중복 제거
+        #    필요한 개수 + 중복될 수 있는 개수만큼만 이웃을 가져오고, 모자라면 두 배씩 늘려서 다시 가져옴
+        needed = top_n - len(final_recommendations)
+        k = needed + len(seen)
+        content_recs = []
+        while needed > 0:
+            neighbors = self._content_neighbors(idx, k)
+            content_recs = []
+            content_seen = set(seen)
+            for rec_title in self.df['title'].iloc[neighbors].tolist():
+                if rec_title not in content_seen:
+                    content_seen.add(rec_title)
+                    content_recs.append(rec_title)
+                    if len(content_recs) >= needed:
+                        break
+            if len(content_recs) >= needed or len(neighbors) < k:
+                break
+            k *= 2
 
-    async def get_enriched_recommendations(self, title: str, top_n: int = 10):
+        final_recommendations.extend(content_recs)
+        return final_recommendations[:top_n]
+
+
+    def _content_neighbors(self, idx, k: int):
         """
-        하이브리드 추천 목록을 만든 후, Jikan API로 최신 정보를 보강하여 반환 (안정화된 버전)
+        idx 행과 콘텐츠가 가장 비슷한 행 번호 최대 k개를 유사도 내림차순으로 반환합니다.
+        (neighbors 모드: 미리 계산된 상위 K개 이웃 / dense 모드: 유사도 행에서 부분 선택)
+        """
+        if self.neighbor_ids is not None:
+            return self.neighbor_ids[idx, :k]
+
+        return top_k_indices(self.cosine_sim[idx], k, exclude=[idx])
+
+
+    def get_batch_recommendations(self, titles: list, anime_ids: list, top_n: int = 20):
+        """
+        여러 제목/anime_id의 하이브리드 추천을 한 번에 계산하여 입력값별로 반환합니다.
+        콘텐츠 이웃은 모든 입력 행에 대해 한 번의 행렬 연산으로 구합니다.
+        반환값: {"titles": {제목: [추천 제목] | None}, "anime_ids": {anime_id: [추천 제목] | None}}
+        """
+        if self.df is None:
+            return None
+
+        # 1. 입력값을 (추천 기준 제목, 행 번호)로 한꺼번에 변환
+        queries = []
+        for title in titles:
+            queries.append(("titles", title, title, self.indices.get(title)))
+        for anime_id in anime_ids:
+            row = self.id_indices.get(anime_id)
+            title = self.df['title'].iat[row] if row is not None else None
+            queries.append(("anime_ids", anime_id, title, row))
+
+        # 2. 중복을 뺀 행들의 콘텐츠 이웃을 한 번에 계산
+        rows = np.unique([row for _, _, _, row in queries if row is not None]).astype(np.int64)
+        longest_behavioral = max((len(self.behavioral_map.get(q[2], [])) for q in queries), default=0)
+        neighbors = self._batch_content_neighbors(rows, top_n + longest_behavioral + 1)
+        row_positions = {int(row): i for i, row in enumerate(rows)}
+        catalog_titles = self.df['title'].to_numpy()
+
+        # 3. 입력값마다 행동 기반 → 콘텐츠 기반 순으로 통합 및 중복 제거
+        results = {"titles": {}, "anime_ids": {}}
+        for kind, key, title, row in queries:
+            if title is None:
+                results[kind][key] = None
+                continue
+
+            final_recommendations = []
+            seen = {title}
+            content_recs = catalog_titles[neighbors[row_positions[int(row)]]] if row is not None else []
+            for rec_title in [*self.behavioral_map.get(title, []), *content_recs]:
+                if rec_title not in seen:
+                    seen.add(rec_title)
+                    final_recommendations.append(rec_title)
+                    if len(final_recommendations) >= top_n:
+                        break
+
+            if row is None and not final_recommendations:
+                final_recommendations = None
+            results[kind][key] = final_recommendations
+
+        return results
+
+
+    def _batch_content_neighbors(self, rows, k: int):
         """
-        candidate_titles = self.get_hybrid_recommendations(title, top_n=20) 
+        여러 행의 콘텐츠 이웃 행 번호를 (len(rows) × k) 배열로 한 번에 반환합니다.
+        neighbors 모드는 미리 계산된 이웃을 그대로 모으고,
+        그 외에는 TF-IDF 행들과 전체 행렬의 곱 한 번으로 유사도를 구해 행마다 부분 선택합니다.
+        """
+        if len(rows) == 0:
+            return np.empty((0, 0), dtype=np.int64)
+        if self.neighbor_ids is not None:
+            return self.neighbor_ids[rows, :k]
+
+        scores = linear_kernel(self.tfidf_matrix[rows], self.tfidf_matrix)
+        scores[np.arange(len(rows)), rows] = -np.inf
+        k = min(k, scores.shape[1] - 1)
+        if k <= 0:
+            return np.empty((len(rows), 0), dtype=np.int64)
+        return top_k_per_row(scores, k)[0]
+
 
+    def get_hybrid_candidates(self, title: str, top_n: int = 20):
+        """
+        하이브리드 추천 결과를 (제목, mal_id) 리스트로 반환합니다.
+        mal_id는 카탈로그 → 행동 데이터 순으로 찾고, 둘 다 없으면 None입니다.
+        """
+        candidate_titles = self.get_hybrid_recommendations(title, top_n=top_n)
         if candidate_titles is None:
             return None
+        return [(rec_title, self._mal_id_for(rec_title)) for rec_title in candidate_titles]
+
+
+    def _mal_id_for(self, rec_title: str):
+        row = self.indices.get(rec_title)
+        if row is not None:
+            return self.records[row]['mal_id']
+        return self.behavioral_ids.get(rec_title)
+
+
+    def _user_cache_key(self, user_id: int, favorites_version, top_n: int):
+        count, max_id = favorites_version
+        return f"{self.model_version}:{user_id}:{count}-{max_id}:{top_n}"
+
+    def get_cached_user_recommendations(self, user_id: int, favorites_version, top_n: int = 20):
+        """캐시된 맞춤 추천 (없으면 MISSING). 즐겨찾기 목록을 읽기 전에 확인합니다."""
+        return user_result_cache.get(self._user_cache_key(user_id, favorites_version, top_n))
+
+    def get_user_recommendations(self, user_id: int, favorites_version, anime_ids: list, top_n: int = 20):
+        """
+        사용자의 즐겨찾기 전체를 기준으로, 아직 즐겨찾기하지 않은 작품을 추천하고 캐시에 저장합니다.
+        결과는 (모델 버전, 사용자, 즐겨찾기 버전, top_n) 키로 캐시하므로 즐겨찾기가 바뀌면 새로 계산됩니다.
+        (카탈로그에 있는 즐겨찾기가 없으면 빈 리스트)
+        """
+        recommendations = []
+        for row in self._profile_neighbors(sorted({int(anime_id) for anime_id in anime_ids}), top_n):
+            details = dict(self.records[row])
+            if details['image_url'] is None:
+                details['image_url'] = NO_IMAGE_URL
+            recommendations.append(details)
+        user_result_cache.set(self._user_cache_key(user_id, favorites_version, top_n), recommendations)
+        return recommendations
+
+
+    def _profile_neighbors(self, anime_ids: list, k: int):
+        """
+        즐겨찾기 행들의 TF-IDF 벡터 합(사용자 프로필)과 가장 비슷한 행 번호 k개 (즐겨찾기 행 제외)
+        TF-IDF 행은 L2 정규화돼 있으므로, 각 행의 점수 = 즐겨찾기 작품들과의 코사인 유사도 합
+        """
+        rows = np.unique([self.id_indices[anime_id] for anime_id in anime_ids if anime_id in self.id_indices])
+        if len(rows) == 0:
+            return np.empty(0, dtype=np.int64)
+
+        # 즐겨찾기 행 선택 벡터(1 × N, 희소) · TF-IDF → 프로필(1 × V), 전체 TF-IDF · 프로필 → 점수(N)
+        selector = sparse.csr_matrix((np.ones(len(rows)), (np.zeros(len(rows)), rows)), shape=(1, self.tfidf_matrix.shape[0]))
+        profile = selector @ self.tfidf_matrix
+        scores = (self.tfidf_matrix @ profile.T).toarray().ravel()
+        return top_k_indices(scores, k, exclude=rows)
+
+
+    async def get_enriched_recommendations(self, title: str, top_n: int = 10):
+        """
+        하이브리드 추천 목록을 만든 후, Jikan API로 최신 정보를 보강하여 반환 (안정화된 버전)
+        결과는 (모델 버전, 제목, top_n) 키로 캐시하므로 모델이 바뀌면 자동으로 새로 계산됩니다.
+        """
+        cache_key = f"{self.model_version}:{top_n}:{title}"
+        cached = result_cache.get(cache_key)
+        if cached is not MISSING:
+            return cached
+
+        recommendations, complete = await self._compute_enriched_recommendations(title, top_n)
+        # 아직 Jikan 갱신을 기다리는 항목이 있으면, 갱신 후 다시 만들 수 있도록 캐시하지 않음
+        if complete:
+            result_cache.set(cache_key, recommendations)
+        return recommendations
+
+
+    async def _compute_enriched_recommendations(self, title: str, top_n: int):
+        """
+        추천 결과와, 모든 항목의 정보가 채워졌는지(캐시해도 되는지) 여부를 반환합니다.
+        """
+        # 같은 제목의 후보 계산이 이미 진행 중이면 그 결과를 함께 기다림 (계산은 스레드에서 실행)
+        candidates = await self.hybrid_flight.do(title, asyncio.to_thread, self.get_hybrid_candidates, title, 20)
+
+        if candidates is None:
+            return None, True
+
+        if ENRICHMENT_MODE == "local":
+            final_list = []
+            complete = True
+            for rec_title, mal_id in candidates:
+                details, pending = self._local_details(rec_title, mal_id)
+                complete = complete and not pending
+                if details:
+                    final_list.append(details)
+                    if len(final_list) >= top_n:
+                        break
+            return final_list, complete
 
         final_list = []
-        
-        for i, rec_title in enumerate(candidate_titles):
-            # Jikan API Rate Limit을 피하기 위한 딜레이 (0.5초)
-            if i > 0:
-                 await asyncio.sleep(0.5) 
-            
-            # jikan_client.py의 비동기 함수 호출
-            enriched_data = await fetch_anime_details(rec_title)
-            
-            if enriched_data and len(final_list) < top_n:
-                final_list.append(enriched_data)
-                
-            if len(final_list) >= top_n:
-                break
+        position = 0
+
+        # 필요한 개수만큼 동시에 요청하고, 정보를 못 찾은 만큼 다음 후보로 다시 채움
+        # (호출 속도는 jikan_client의 공용 리미터가 Jikan 제한에 맞춰 조절)
+        while len(final_list) < top_n and position < len(candidates):
+            window = candidates[position: position + top_n - len(final_list)]
+            position += len(window)
+
+            results = await asyncio.gather(
+                *(fetch_candidate_details(rec_title, mal_id) for rec_title, mal_id in window)
+            )
+            final_list.extend(enriched_data for enriched_data in results if enriched_data)
             
         print(f"✅ Jikan API 정보 보강 완료. 최종 {len(final_list)}개 반환.")
-        return final_list
+        return final_list, True
     
+    def _local_details(self, rec_title: str, mal_id=None):
+        """
+        카탈로그에서 추천 항목 정보를 O(1)로 만듭니다.
+        - 캐시된 Jikan 정보가 있으면 REFRESHABLE_FIELDS는 그 값(더 최신)을 우선 사용
+        - 캐시가 없거나 만료됐으면 백그라운드 갱신만 예약하고 카탈로그 값으로 바로 응답
+          (비어 있는 필드가 있을 때만 '기다리는 중'으로 표시, REFRESH_STALE_DETAILS가 꺼져 있으면 이때만 갱신)
+        (카탈로그에 없는 제목은 캐시된 Jikan 정보가 있을 때만 반환)
+        반환값: (정보 | None, 백그라운드 갱신을 기다리는 중인지 여부)
+        """
+        row = self.indices.get(rec_title)
+        cached = peek_cached_details(rec_title, mal_id)
+
+        if row is None:
+            if cached is MISSING:
+                self._schedule_refresh(rec_title, mal_id)
+                return None, True
+            return cached, False
+
+        details = dict(self.records[row])
+        missing = any(details[field] is None for field in REFRESHABLE_FIELDS)
+        pending = missing and cached is MISSING
+        if pending:
+            self._schedule_refresh(rec_title, mal_id)
+        elif cached is MISSING:
+            # 카탈로그 값은 있지만 오래됐을 수 있으므로, 여유가 있을 때만 갱신
+            if REFRESH_STALE_DETAILS and len(self._refreshing) < STALE_REFRESH_MAX_PENDING:
+                self._schedule_refresh(rec_title, mal_id)
+        elif cached:
+            for field in REFRESHABLE_FIELDS:
+                if cached.get(field) is not None:
+                    details[field] = cached[field]
+        if details['image_url'] is None:
+            details['image_url'] = NO_IMAGE_URL
+        return details, pending
+
+
+    def _schedule_refresh(self, rec_title: str, mal_id=None):
+        # 같은 제목은 한 번만 갱신하고, 응답은 기다리지 않음 (결과는 Jikan 캐시에 저장됨)
+        if rec_title in self._refreshing:
+            return
+        self._refreshing.add(rec_title)
+
+        task = asyncio.create_task(fetch_candidate_details(rec_title, mal_id))
+        self._refresh_tasks.add(task)
+
+        def _done(finished_task):
+            self._refresh_tasks.discard(finished_task)
+            self._refreshing.discard(rec_title)
+        task.add_done_callback(_done)
+
     # recommender.py (RecommenderService 클래스 내부에 추가)
 
     # ... (get_enriched_recommendations 함수 아래에 추가) ...
 
-    def get_all_animes(self, skip: int = 0, limit: int = 20):
+    def get_all_animes(self, skip: int = 0, limit: int = 20, genres=(), min_score=None, max_score=None, sort=None):
         """
-        전체 애니메이션 목록을 skip, limit을 이용해 잘라서 반환합니다.
-        (self.df를 사용)
+        전체 애니메이션 목록을 (장르/점수 필터, 정렬 후) skip, limit을 이용해 잘라서 반환합니다.
+        필터와 정렬은 로드 시 미리 만든 색인(browse_index)으로 처리합니다.
         """
         if self.df is None:
             return []
         
-        # .iloc[start:end] - DataFrame을 정수 위치로 자릅니다.
-        paginated_df = self.df.iloc[skip : skip + limit]
+        # 필터/정렬을 적용한 행 번호로 DataFrame을 정수 위치로 자릅니다.
+        rows = self.browse_index.query(
+            genres=genres or (), min_score=min_score, max_score=max_score, sort=sort, skip=skip, limit=limit
+        )
+        return self._catalog_records(rows)
+
+
+    def _catalog_records(self, rows):
+        """
+        행 번호 목록의 카탈로그 정보를 딕셔너리 리스트로 반환합니다.
+        응답의 'score'는 필터/정렬에 쓰는 숫자 점수(self.scores)로 채움 (원본 'Score' 컬럼은 문자열, 없으면 None)
+        """
+        paginated_df = self.df.iloc[rows]
         
         # DataFrame을 Python 딕셔너리 리스트로 변환하여 반환
-        return paginated_df.to_dict('records')
\ No newline at end of file
+        records = paginated_df.to_dict('records')
+        for record, score in zip(records, self.scores[rows].tolist()):
+            record['score'] = None if np.isnan(score) else score
+        return records
+
+
+    def get_animes_by_ids(self, anime_ids: list):
+        """
+        anime_id 목록에 해당하는 애니 정보를 요청한 순서대로 반환합니다.
+        (id → 행 번호 해시 인덱스(id_indices)로 O(1) 조회, 카탈로그에 없는 id와 중복 id는 건너뜀)
+        """
+        if self.df is None:
+            return []
+
+        rows = []
+        for anime_id in dict.fromkeys(anime_ids):
+            row = self.id_indices.get(anime_id)
+            if row is not None:
+                rows.append(row)
+        return self._catalog_records(rows)
+
+
+    def get_anime_by_id(self, anime_id: int):
+        """anime_id 하나의 애니 정보 (없으면 None)"""
+        animes = self.get_animes_by_ids([anime_id])
+        return animes[0] if animes else None
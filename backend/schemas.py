@@ -1,6 +1,6 @@
 # schemas.py
 
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 
 # --- 1. User 생성을 위한 입력 스키마 ---
 # (API로 '받을' 데이터 형태)
@@ -41,12 +41,26 @@ class Anime(BaseModel):
     class Config:
         orm_mode = True
 
+# 애니 상세 정보 (GET /animes/{anime_id})
+class AnimeDetail(Anime):
+    synopsis: str | None = None
+
+# 여러 애니를 한 번에 추천받을 때 Body로 받을 정보 (POST /animes/recommend/batch)
+class RecommendBatchRequest(BaseModel):
+    titles: list[str] = Field(default_factory=list, max_length=100)
+    anime_ids: list[int] = Field(default_factory=list, max_length=100)
+    top_n: int = Field(default=20, ge=1, le=100)
+
 # 즐겨찾기를 '생성'할 때 Body로 받을 정보 (POST /users/me/favorites)
 class UserFavoriteCreate(BaseModel):
     anime_id: int
     title: str
     image_url: str | None = None
 
+# 즐겨찾기를 한 번에 여러 개 추가할 때 Body로 받을 정보 (POST /users/me/favorites/bulk)
+class UserFavoriteBulkCreate(BaseModel):
+    favorites: list[UserFavoriteCreate] = Field(min_length=1, max_length=500)
+
 # 즐겨찾기 정보를 '응답'할 때 사용할 기본 모델
 class UserFavorite(UserFavoriteCreate):
     id: int       # DB에서 생성된 고유 ID
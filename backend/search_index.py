@@ -0,0 +1,197 @@
+# search_index.py
+
+import bisect
+import unicodedata
+import numpy as np
+
+# 검색 대상이 되는 카탈로그 컬럼 (제목, 영어 제목, 일본어 제목)
+NAME_COLUMNS = ('title', 'English name', 'Other name')
+# 값이 없을 때 원본 데이터에 들어 있는 표시
+UNKNOWN_NAMES = {'', 'unknown'}
+
+
+def normalize_title(text) -> str:
+    """
+    검색용 정규화: 유니코드 정규화(NFKC) + 대소문자 무시 + 문자/숫자 외에는 공백 하나로 통일
+    예) "Re:Zero kara  Hajimeru" → "re zero kara hajimeru"
+    """
+    text = unicodedata.normalize("NFKC", str(text)).casefold()
+    return " ".join("".join(ch if ch.isalnum() else " " for ch in text).split())
+
+
+def catalog_names(df):
+    """
+    행마다 검색에 쓸 이름(정규화된 제목/영어 제목/일본어 제목, 중복 제거) 리스트를 반환합니다.
+    """
+    columns = [df[column].tolist() for column in NAME_COLUMNS if column in df.columns]
+    names_per_row = []
+    for values in zip(*columns):
+        names = []
+        for value in values:
+            if value is None or value != value:  # None / NaN
+                continue
+            name = normalize_title(value)
+            if name not in UNKNOWN_NAMES and name not in names:
+                names.append(name)
+        names_per_row.append(names)
+    return names_per_row
+
+
+def _grams(text: str, n: int):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def _contains_sorted(large, small):
+    # 정렬된 두 배열에서 small 중 large에도 있는 값만 남김 (O(len(small) · log len(large)))
+    if len(large) == 0 or len(small) == 0:
+        return small[:0]
+    positions = np.searchsorted(large, small).clip(max=len(large) - 1)
+    return small[large[positions] == small]
+
+
+class TitleSearchIndex:
+    """
+    제목 부분 문자열 검색용 문자 n-gram(2·3글자) 역색인입니다.
+    - 모든 행을 점수 내림차순 '순위'로 미리 정렬해 두고, 각 n-gram의 posting 리스트에는 순위를 오름차순으로 저장합니다.
+    - 검색어의 n-gram posting들을 짧은 것부터 교집합하면 후보가 이미 점수순이므로,
+      앞에서부터 실제 부분 문자열인지 확인하면서 top_n개만 모으면 됩니다. (정렬 불필요)
+    """
+    def __init__(self, names_per_row, scores):
+        scores = np.nan_to_num(np.asarray(scores, dtype=np.float64), nan=-np.inf)
+        self.rank_to_row = np.argsort(-scores, kind='stable').astype(np.int32)
+
+        # 여러 이름을 한 문자열로 합치되, 구분자(\x00)를 넣어 이름 경계를 넘는 매칭을 막음
+        self.texts = ["\x00".join(names_per_row[row]) for row in self.rank_to_row]
+
+        postings = {}
+        for rank, text in enumerate(self.texts):
+            for gram in _grams(text, 2) | _grams(text, 3):
+                if "\x00" in gram:
+                    continue
+                postings.setdefault(gram, []).append(rank)
+        self.postings = {gram: np.array(ranks, dtype=np.int32) for gram, ranks in postings.items()}
+
+    def search(self, keyword: str, top_n: int = 10):
+        """keyword를 포함하는 행 번호를 점수 내림차순으로 최대 top_n개 반환합니다."""
+        query = normalize_title(keyword)
+        if not query:
+            return []
+
+        if len(query) == 1:
+            # 한 글자는 거의 모든 제목에 있으므로 순위대로 훑어도 금방 top_n개가 모임
+            candidates = range(len(self.texts))
+        else:
+            n = min(len(query), 3)
+            posting_lists = [self.postings.get(gram) for gram in _grams(query, n)]
+            if any(posting is None for posting in posting_lists):
+                return []
+
+            posting_lists.sort(key=len)
+            candidates = posting_lists[0]
+            for posting in posting_lists[1:]:
+                candidates = _contains_sorted(posting, candidates)
+                if len(candidates) == 0:
+                    return []
+
+        results = []
+        for rank in candidates:
+            if query in self.texts[rank]:
+                results.append(int(self.rank_to_row[rank]))
+                if len(results) >= top_n:
+                    break
+        return results
+
+
+class AutocompleteIndex:
+    """
+    자동완성용 접두사 색인입니다.
+    - 정규화된 제목/별칭과 그 안의 각 단어에서 시작하는 꼬리 문자열을 정렬된 키 배열로 만들어,
+      접두사에 맞는 키 범위를 이진 탐색 두 번으로 찾습니다.
+    - 범위 안에서는 인기도(weights) 상위 항목만 부분 선택(argpartition)합니다.
+    - 정확한 접두사 결과가 모자라면 편집 거리 1(삭제/교체/삽입/인접 교환)까지 허용해 오타를 보정합니다.
+      (FUZZY_MIN_LENGTH ~ FUZZY_MAX_LENGTH 글자인 검색어만)
+    """
+    # 오타 보정은 검색어가 이 길이 이상일 때만 (짧은 검색어는 후보가 너무 많아짐)
+    FUZZY_MIN_LENGTH = 3
+    # 오타 보정은 검색어가 이 길이 이하일 때만 (변형 수가 길이 × 2 × 문자 수로 늘어나 이벤트 루프를 오래 잡음)
+    FUZZY_MAX_LENGTH = 30
+    # 교체/삽입에 쓰는 기본 문자 집합 (검색어에 있는 다른 문자도 함께 사용)
+    BASE_ALPHABET = "abcdefghijklmnopqrstuvwxyz0123456789 "
+
+    def __init__(self, names_per_row, weights):
+        entries = set()
+        for row, names in enumerate(names_per_row):
+            for name in names:
+                for start in [0] + [i + 1 for i, ch in enumerate(name) if ch == " "]:
+                    entries.add((name[start:], row))
+        entries = sorted(entries)
+
+        self.keys = [key for key, _ in entries]
+        self.rows = np.array([row for _, row in entries], dtype=np.int32)
+        self.row_weights = np.nan_to_num(np.asarray(weights, dtype=np.float64), nan=0.0)
+        self.weights = self.row_weights[self.rows]
+
+    def _prefix_range(self, prefix: str):
+        lo = bisect.bisect_left(self.keys, prefix)
+        if lo >= len(self.keys) or not self.keys[lo].startswith(prefix):
+            return lo, lo
+        return lo, bisect.bisect_left(self.keys, prefix + "\U0010ffff", lo)
+
+    def _top_rows(self, lo: int, hi: int, limit: int, exclude: set):
+        # 범위 안에서 인기도 상위 행을 중복 없이 limit개까지 (같은 행의 키가 여러 개일 수 있음)
+        size = hi - lo
+        k = min(size, limit * 4)
+        while True:
+            weights = self.weights[lo:hi]
+            part = np.argpartition(-weights, k - 1)[:k] if k < size else np.arange(size)
+            part = part[np.argsort(-weights[part], kind='stable')]
+            rows = []
+            for row in self.rows[lo + part].tolist():
+                if row not in exclude and row not in rows:
+                    rows.append(row)
+                    if len(rows) >= limit:
+                        return rows
+            if k >= size:
+                return rows
+            k = min(size, k * 2)
+
+    def _typo_variants(self, query: str):
+        alphabet = set(self.BASE_ALPHABET) | set(query)
+        variants = set()
+        for i in range(len(query)):
+            variants.add(query[:i] + query[i + 1:])
+            if i + 1 < len(query):
+                variants.add(query[:i] + query[i + 1] + query[i] + query[i + 2:])
+            # 마지막 글자의 교체와 끝에 삽입하는 경우는 '마지막 글자 삭제' 접두사에 이미 포함됨
+            if i + 1 < len(query):
+                for ch in alphabet:
+                    variants.add(query[:i] + ch + query[i + 1:])
+                    variants.add(query[:i] + ch + query[i:])
+        variants.discard(query)
+        variants.discard("")
+        return variants
+
+    def complete(self, query: str, limit: int = 10):
+        """
+        검색어로 시작하는 제목의 행 번호를 (정확한 접두사 → 오타 보정) 순서, 각각 인기도 순으로 반환합니다.
+        """
+        query = normalize_title(query)
+        if not query or limit <= 0:
+            return []
+
+        lo, hi = self._prefix_range(query)
+        rows = self._top_rows(lo, hi, limit, set()) if hi > lo else []
+        if len(rows) >= limit or not self.FUZZY_MIN_LENGTH <= len(query) <= self.FUZZY_MAX_LENGTH:
+            return rows
+
+        # 오타 보정: 편집 거리 1인 접두사들의 범위를 모아 인기도 순으로 채움
+        fuzzy = []
+        seen = set(rows)
+        for variant in self._typo_variants(query):
+            v_lo, v_hi = self._prefix_range(variant)
+            if v_hi > v_lo:
+                for row in self._top_rows(v_lo, v_hi, limit, seen):
+                    seen.add(row)
+                    fuzzy.append(row)
+        fuzzy.sort(key=lambda row: (-self.row_weights[row], row))
+        return rows + fuzzy[:limit - len(rows)]
@@ -0,0 +1,61 @@
+# serve.py
+#
+# 여러 워커로 서버를 띄우는 실행 진입점입니다.
+#   python serve.py
+#
+# 1. 워커를 만들기 전에 마스터 프로세스에서 모델 아티팩트를 준비합니다.
+#    (원본 CSV가 바뀌었을 때만 다시 학습 - build_models.py 참고)
+# 2. preload_app으로 main:app을 마스터에서 한 번만 import한 뒤 워커를 fork 합니다.
+#    각 워커는 lifespan에서 1번의 아티팩트를 백그라운드로 엽니다. 유사도/이웃/TF-IDF 배열은
+#    numpy.memmap으로 열리기 때문에 (model_store.py 참고) 워커가 몇 개든
+#    호스트의 페이지 캐시에 있는 읽기 전용 사본 하나를 함께 씁니다.
+#
+# 환경 변수
+#   WEB_CONCURRENCY  워커 수 (기본값: CPU 코어 수)
+#                    워커마다 bcrypt 프로세스 풀이 따로 생기므로, 풀 크기 기본값은 코어 수를 이 값으로 나눈 값
+#                    (password_hashing.py 참고)
+#   BIND             바인드 주소 (기본값: 0.0.0.0:8000)
+#   WORKER_TIMEOUT   워커 타임아웃 초 (기본값: 120)
+
+import os
+import multiprocessing
+
+from gunicorn.app.base import BaseApplication
+
+from model_loader import load_all_models
+
+
+class AnimeServer(BaseApplication):
+    def __init__(self, options: dict):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from main import app
+        return app
+
+
+def main():
+    if load_all_models() is None:
+        raise SystemExit("❌ 모델 아티팩트를 준비하지 못했습니다.")
+
+    workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+    # 워커에서 import되는 password_hashing이 워커 수를 알 수 있게 함
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+
+    options = {
+        "bind": os.getenv("BIND", "0.0.0.0:8000"),
+        "workers": workers,
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "preload_app": True,
+        "timeout": int(os.getenv("WORKER_TIMEOUT", "120")),
+    }
+    AnimeServer(options).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+# singleflight.py
+
+import asyncio
+
+
+class SingleFlight:
+    """
+    같은 key의 비동기 작업이 이미 실행 중이면 새로 실행하지 않고,
+    나중에 온 호출자들도 그 작업의 결과를 함께 기다리게 합니다. (요청 병합)
+    """
+    def __init__(self):
+        self._inflight = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key, func, *args):
+        """func(*args)를 key 당 동시에 한 번만 실행하고, 그 결과를 반환합니다."""
+        task = self._inflight.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(func(*args))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+
+        # 한 호출자가 취소되어도 같은 작업을 기다리는 다른 호출자에게는 영향이 없게 함
+        return await asyncio.shield(task)
+
+    def stats(self):
+        return {"in_flight": len(self._inflight), "calls": self.calls, "coalesced": self.coalesced}
@@ -0,0 +1,9 @@
+# conftest.py
+#
+# 테스트는 backend/ 안의 모듈을 서버와 같은 방식(import search_index 등)으로 가져옵니다.
+#   cd backend && python -m pytest -q tests
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,79 @@
+# test_browse_index.py
+#
+# /animes 목록 색인(CatalogBrowseIndex)의 필터/정렬 결과가 pandas로 직접 거르고 정렬한 결과와 같은지 확인합니다.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import browse_index
+from browse_index import CatalogBrowseIndex, SORT_COLUMNS
+
+GENRES = ["Action", "Comedy", "Drama", "Romance", "Fantasy", "Sci-Fi", "Slice of Life"]
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    rng = np.random.default_rng(0)
+    n = 500
+    df = pd.DataFrame({
+        'genres': [", ".join(rng.choice(GENRES, rng.integers(1, 4), replace=False)) for _ in range(n)],
+        'Popularity': rng.integers(0, 300, n),   # 0은 순위 없음
+        'Favorites': rng.integers(0, 50, n),     # 동점이 많음
+    })
+    df.loc[rng.choice(n, 10, replace=False), 'genres'] = "UNKNOWN"
+    scores = rng.uniform(4, 9, n).round(1)       # 동점이 많음
+    scores[rng.choice(n, 40, replace=False)] = np.nan
+    return df, scores
+
+
+def _pandas_query(df, scores, genres=(), min_score=None, max_score=None, sort=None, skip=0, limit=20):
+    frame = df.assign(score=scores, row=np.arange(len(df)))
+    keep = pd.Series(True, index=frame.index)
+    for genre in genres:
+        keep &= frame['genres'].str.split(',').apply(lambda values: genre.lower() in [v.strip().lower() for v in values])
+    if min_score is not None:
+        keep &= frame['score'] >= min_score
+    if max_score is not None:
+        keep &= frame['score'] <= max_score
+    frame = frame[keep]
+
+    if sort is not None:
+        column, descending = SORT_COLUMNS[sort]
+        values = frame['score'] if column == 'Score' else frame[column].astype(float)
+        if column == 'Popularity':
+            values = values.where(values > 0)
+        # 값이 없는 행은 맨 뒤, 같은 값이면 원래 순서
+        frame = frame.assign(_key=values).sort_values('_key', ascending=not descending, na_position='last', kind='stable')
+    return frame['row'].iloc[skip:skip + limit].tolist()
+
+
+@pytest.mark.parametrize("sort", [None, "score", "popularity", "favorites"])
+def test_query_matches_pandas(catalog, sort, monkeypatch):
+    # 청크 경계를 여러 번 넘도록 청크를 작게
+    monkeypatch.setattr(browse_index, "SCAN_CHUNK_SIZE", 37)
+    df, scores = catalog
+    index = CatalogBrowseIndex(df, scores)
+    rng = np.random.default_rng(1)
+
+    def pick(values):
+        return values[rng.integers(len(values))]
+
+    for _ in range(150):
+        params = dict(
+            genres=list(rng.choice(GENRES, rng.integers(0, 3), replace=False)),
+            min_score=pick([None, None, 5.0, 6.5, 8.2, 9.5]),
+            max_score=pick([None, None, 4.0, 7.0, 8.5]),
+            sort=sort,
+            skip=pick([0, 3, 40, 200]),
+            limit=pick([1, 20, 100]),
+        )
+        assert index.query(**params) == _pandas_query(df, scores, **params), params
+
+
+def test_unknown_genre_returns_nothing(catalog):
+    df, scores = catalog
+    index = CatalogBrowseIndex(df, scores)
+    assert index.query(genres=["Mecha"]) == []
+    assert index.query(genres=["unknown"]) == []
+    assert "slice of life" in index.genres()
@@ -0,0 +1,143 @@
+# test_incremental_add.py
+#
+# 신작 증분 추가(add_catalog_rows)가 전체를 다시 계산한 결과와 같은지 확인합니다. (동점 순서는 무시)
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import linear_kernel
+
+import model_store
+from model_loader import TFIDF_PARAMS, add_catalog_rows, build_neighbor_index, make_soup, top_k_per_row
+
+WORDS = "ninja dragon school idol space pirate magic detective love war robot music sport demon vampire time".split()
+GENRES = ["Action", "Comedy", "Drama", "Romance", "Fantasy", "Sci-Fi"]
+K = 10
+
+
+def _synthetic(n, start_id, seed):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'anime_id': np.arange(start_id, start_id + n),
+        'title': [f"Title {start_id + i}" for i in range(n)],
+        'synopsis': [" ".join(rng.choice(WORDS, 25)) for _ in range(n)],
+        'genres': [", ".join(rng.choice(GENRES, 2, replace=False)) for _ in range(n)],
+        'image_url': [f"http://img/{start_id + i}.jpg" for i in range(n)],
+        'Score': rng.uniform(5, 9, n).round(2),
+        'Scored By': rng.integers(100, 10000, n).astype(float),
+        'Rank': rng.integers(1, 5000, n).astype(float),
+    })
+
+
+def _catalog(string_dtype=None):
+    # anime-dataset-2023처럼 Score/Scored By/Rank가 'UNKNOWN'이 섞인 문자열 컬럼인 카탈로그
+    df = _synthetic(200, start_id=1, seed=0)
+    for column in ('Score', 'Scored By', 'Rank'):
+        values = df[column].astype(str)
+        values.iloc[::17] = "UNKNOWN"
+        df[column] = values.astype(string_dtype) if string_dtype else values
+    return df
+
+
+def _model_data(similarity_mode, string_dtype=None):
+    df = _catalog(string_dtype)
+    vectorizer = TfidfVectorizer(**TFIDF_PARAMS)
+    tfidf_matrix = vectorizer.fit_transform(make_soup(df))
+    data = {
+        'df': df,
+        'vectorizer': vectorizer,
+        'tfidf_matrix': tfidf_matrix,
+        'cosine_sim': None,
+        'neighbor_ids': None,
+        'neighbor_scores': None,
+        'behavioral_pairs': pd.DataFrame({'title_1': ["Title 1"], 'id_1': [1], 'title_2': ["Title 2"], 'id_2': [2]}),
+    }
+    if similarity_mode == "dense":
+        data['cosine_sim'] = linear_kernel(tfidf_matrix, tfidf_matrix)
+    else:
+        data['neighbor_ids'], data['neighbor_scores'] = build_neighbor_index(tfidf_matrix, top_k=K, block_size=64)
+    return data
+
+
+def _new_titles():
+    # now_anime.csv(Jikan) 형식, 이미 카탈로그에 있는 id 하나 포함
+    new_df = _synthetic(30, start_id=1000, seed=1)
+    new_titles = new_df.rename(columns={'anime_id': 'mal_id', 'Score': 'score', 'Scored By': 'scored_by', 'Rank': 'rank'})
+    return pd.concat([new_titles, new_titles.head(1).assign(mal_id=1)], ignore_index=True)
+
+
+def test_dense_add_matches_full_rebuild():
+    data = _model_data("dense")
+    new_data = add_catalog_rows(data, _new_titles())
+
+    assert len(new_data['df']) == 230
+    full = linear_kernel(new_data['tfidf_matrix'], new_data['tfidf_matrix'])
+    np.testing.assert_allclose(new_data['cosine_sim'], full, atol=1e-6)
+
+
+def test_neighbors_add_matches_full_rebuild():
+    data = _model_data("neighbors")
+    new_data = add_catalog_rows(data, _new_titles())
+
+    assert len(new_data['df']) == 230
+    full = linear_kernel(new_data['tfidf_matrix'], new_data['tfidf_matrix'])
+    np.fill_diagonal(full, -np.inf)
+    _, expected_scores = top_k_per_row(full, K)
+
+    ids = np.asarray(new_data['neighbor_ids'])
+    scores = np.asarray(new_data['neighbor_scores'])
+    # 점수는 같아야 하고, 동점이면 어느 행을 골랐는지는 다를 수 있으므로 고른 행의 실제 점수로 확인
+    np.testing.assert_allclose(scores, expected_scores, atol=1e-6)
+    np.testing.assert_allclose(np.take_along_axis(full, ids, axis=1), scores, atol=1e-6)
+    assert all(row not in row_ids for row, row_ids in enumerate(ids))
+
+
+def test_add_without_new_titles_returns_none():
+    data = _model_data("neighbors")
+    assert add_catalog_rows(data, data['df'].rename(columns={'anime_id': 'mal_id'})) is None
+
+
+@pytest.mark.parametrize("string_dtype", [None, object])
+def test_added_rows_keep_string_columns_and_save(tmp_path, monkeypatch, string_dtype):
+    # None: pandas 기본 문자열 dtype (pandas 3부터 str), object: 예전 pandas
+    monkeypatch.setattr(model_store, "ARTIFACT_ROOT", str(tmp_path))
+    data = _model_data("neighbors", string_dtype)
+    new_data = add_catalog_rows(data, _new_titles())
+
+    added = new_data['df'].iloc[200:]
+    for column in ('Score', 'Scored By', 'Rank'):
+        assert all(isinstance(value, str) for value in added[column])
+
+    version = model_store.save_artifacts(new_data, "0" * 64, similarity_mode="neighbors")
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted(["LATEST", version])
+    loaded = model_store.load_artifacts(version)
+    assert loaded['df']['Score'].tolist() == new_data['df']['Score'].tolist()
+    np.testing.assert_array_equal(loaded['neighbor_ids'], new_data['neighbor_ids'])
+
+
+def test_failed_save_leaves_no_tmp_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(model_store, "ARTIFACT_ROOT", str(tmp_path))
+    data = _model_data("neighbors")
+    # 숫자와 문자열이 섞인 컬럼은 parquet으로 저장할 수 없음
+    data['df'] = data['df'].astype({'Score': object})
+    data['df'].loc[0, 'Score'] = 1.5
+    with pytest.raises(Exception):
+        model_store.save_artifacts(data, "0" * 64, similarity_mode="neighbors")
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_save_prunes_old_versions_and_checks_settings(tmp_path, monkeypatch):
+    monkeypatch.setattr(model_store, "ARTIFACT_ROOT", str(tmp_path))
+    data = _model_data("neighbors")
+    settings = {"neighbor_top_k": K}
+    checksum = "0" * 64
+
+    base = model_store.save_artifacts(data, checksum, similarity_mode="neighbors", settings=settings)
+    first = model_store.save_artifacts(data, checksum, "neighbors", version="a", base_version=base, settings=settings)
+    second = model_store.save_artifacts(data, checksum, "neighbors", version="b", base_version=first, settings=settings)
+    # LATEST와 그 신작 추가 전 버전만 남음
+    assert sorted(path.name for path in tmp_path.iterdir() if path.is_dir()) == sorted([first, second])
+
+    assert model_store.load_latest(checksum, "neighbors", settings=settings) is not None
+    assert model_store.load_latest(checksum, "neighbors", settings={"neighbor_top_k": K + 1}) is None
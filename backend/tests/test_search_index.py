@@ -0,0 +1,84 @@
+# test_search_index.py
+#
+# 제목 검색/자동완성 색인이 전체를 훑는 단순한 방식과 같은 결과를 내는지 확인합니다.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from search_index import TitleSearchIndex, AutocompleteIndex, catalog_names, normalize_title
+
+WORDS = ["ninja", "dragon", "school", "idol", "space", "pirate", "magic", "detective", "love", "war"]
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    rng = np.random.default_rng(0)
+    n = 300
+    df = pd.DataFrame({
+        'title': [f"{WORDS[i % 10]} {WORDS[(i * 7) % 10]} no Title {i}" for i in range(n)],
+        'English name': [f"The {WORDS[(i * 3) % 10].title()} Story" if i % 4 else "UNKNOWN" for i in range(n)],
+        'Other name': [f"日本{i}" if i % 5 else None for i in range(n)],
+    })
+    scores = rng.uniform(5, 9, n).round(2)
+    scores[rng.choice(n, 20, replace=False)] = np.nan
+    return df, catalog_names(df), scores
+
+
+def _brute_force_search(names, scores, keyword, top_n):
+    query = normalize_title(keyword)
+    rows = [row for row, row_names in enumerate(names) if any(query in name for name in row_names)]
+    keys = np.nan_to_num(np.asarray(scores, dtype=np.float64), nan=-np.inf)
+    rows.sort(key=lambda row: (-keys[row], row))
+    return rows[:top_n]
+
+
+@pytest.mark.parametrize("keyword", ["n", "ni", "ninja", "Title 1", "no title 12", "the dragon", "日本1", "xyz", "Re:Zero"])
+@pytest.mark.parametrize("top_n", [5, 1000])
+def test_search_matches_brute_force(catalog, keyword, top_n):
+    df, names, scores = catalog
+    index = TitleSearchIndex(names, scores)
+    assert index.search(keyword, top_n) == _brute_force_search(names, scores, keyword, top_n)
+
+
+def _brute_force_prefix(names, query):
+    # 이름 전체 또는 이름 안의 어떤 단어부터 시작하는 꼬리가 query로 시작하는 행
+    query = normalize_title(query)
+    return {
+        row for row, row_names in enumerate(names)
+        if any((" " + name).find(" " + query) != -1 for name in row_names)
+    }
+
+
+@pytest.mark.parametrize("query", ["nin", "drag", "the pir", "story", "title 29", "日本"])
+def test_autocomplete_prefix_matches_brute_force(catalog, query):
+    df, names, scores = catalog
+    weights = np.nan_to_num(scores, nan=0.0)
+    index = AutocompleteIndex(names, weights)
+    expected = _brute_force_prefix(names, query)
+
+    # 정확한 접두사 결과가 limit개 이상이면 오타 보정 결과는 섞이지 않음
+    rows = index.complete(query, limit=len(expected))
+    assert set(rows) == expected
+    assert rows == sorted(rows, key=lambda row: -weights[row])
+
+    top = index.complete(query, limit=5)
+    assert [weights[row] for row in top] == sorted((weights[row] for row in expected), reverse=True)[:5]
+
+
+def test_autocomplete_corrects_one_typo(catalog):
+    df, names, scores = catalog
+    index = AutocompleteIndex(names, np.nan_to_num(scores, nan=0.0))
+    exact = set(index.complete("detective", limit=1000))
+    for typo in ["detectve", "detcetive", "detextive", "deteactive"]:
+        assert set(index.complete(typo, limit=1000)) >= exact
+    assert index.complete("zzzzzz", limit=5) == []
+
+
+def test_autocomplete_skips_typo_correction_for_long_queries(catalog):
+    df, names, scores = catalog
+    index = AutocompleteIndex(names, np.nan_to_num(scores, nan=0.0))
+    # 오타 하나지만 FUZZY_MAX_LENGTH보다 길면 보정하지 않음
+    long_query = "ninja dragon no title 0 " + "x" * index.FUZZY_MAX_LENGTH
+    assert index.complete(long_query, limit=5) == []
+    assert index.complete("ninja ninja no titl", limit=5) != []
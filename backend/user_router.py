@@ -1,14 +1,19 @@
 # user_router.py
 
 # 1. 필요한 모든 모듈을 import 합니다.
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 import schemas
 import crud
 import auth
-from db import get_db, User
+import password_hashing
+from db import get_async_db
+from recommender import RecommenderService
+from cache import MISSING
+from dependencies import get_recommender_service
+import asyncio
 from typing import List
 
 # 2. 'app = FastAPI()' 대신 'APIRouter()'를 사용합니다.
@@ -18,30 +23,30 @@ router = APIRouter()
 # 3. '@app.post(...)' 대신 '@router.post(...)'를 사용합니다.
 #    주소는 "/register"로 지정합니다. (prefix는 main.py에서 붙여줌)
 @router.post("/register", response_model=schemas.User)
-def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
+async def register_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
     """
     새로운 사용자를 생성 (회원가입)
     - 주소: /users/register
     """
     # 1. 이메일 중복 확인
-    db_user = crud.get_user_by_email(db, email=user.email)
+    db_user = await crud.get_user_by_email(db, email=user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    # 2. 비밀번호 해시
-    hashed_password = auth.get_password_hash(user.password)
+    # 2. 비밀번호 해시 (전용 프로세스 풀에서 실행, 풀이 가득 차면 503)
+    hashed_password = await password_hashing.hash_password(user.password)
     
     # 3. DB에 사용자 생성
-    new_user = crud.create_user(db=db, user=user, hashed_password=hashed_password)
+    new_user = await crud.create_user(db=db, user=user, hashed_password=hashed_password)
     
     # 4. 생성된 사용자 정보 반환
     return new_user
 
 # 4. 로그인 엔드포인트
 @router.post("/login", response_model=schemas.Token)
-def login_for_access_token(
+async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     사용자 이메일(username)과 비밀번호(password)로 로그인하여 JWT 토큰을 발급받습니다.
@@ -50,15 +55,22 @@ def login_for_access_token(
     
     # 1. 이메일(username)로 사용자 확인
     # (OAuth2 폼은 'username' 필드를 사용하므로, 우리 DB의 'email'과 매칭)
-    user = crud.get_user_by_email(db, email=form_data.username)
+    user = await crud.get_user_by_email(db, email=form_data.username)
     
-    # 2. 사용자가 없거나 비밀번호가 틀리면 에러
-    if not user or not auth.verify_password(form_data.password, user.hashed_password):
+    # 2. 사용자가 없거나 비밀번호가 틀리면 에러 (검증은 전용 프로세스 풀에서 실행)
+    verified, new_hash = (
+        await password_hashing.verify_and_update(form_data.password, user.hashed_password) if user else (False, None)
+    )
+    if not verified:
         raise HTTPException(
             status_code=401, # 401 Unauthorized
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+    # 저장된 해시의 cost가 BCRYPT_ROUNDS와 다르면 방금 검증한 비밀번호로 다시 해시해서 저장
+    if new_hash:
+        await crud.update_user_password(db, user_id=user.id, hashed_password=new_hash)
         
     # 3. 토큰 만료 시간 설정
     # 3. 토큰 만료 시간 설정
@@ -75,7 +87,7 @@ def login_for_access_token(
 
 # 5. 본인 정보 엔드포인트
 @router.get("/me", response_model=schemas.User)
-def read_users_me(
+async def read_users_me(
     current_user: schemas.User = Depends(auth.get_current_user)
 ):  # auth.get_current_user 함수가 성공적으로 사용자를 반환하면,
     # 그 사용자를 'current_user' 변수에 넣어줍니다.
@@ -84,76 +96,107 @@ def read_users_me(
 
 # 6. 비번 수정 엔드포인트
 @router.put("/me", response_model=schemas.User)
-def update_user_me(
+async def update_user_me(
     password_data: schemas.UserUpdatePassword, # Body에서 JSON 받기
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: schemas.User = Depends(auth.get_current_user) # 토큰 검사
 ):
     # 1. 새로 받은 비밀번호를 해시
-    hashed_password = auth.get_password_hash(password_data.new_password)
+    hashed_password = await password_hashing.hash_password(password_data.new_password)
     
     # 2. CRUD 함수를 호출하여 DB 업데이트
-    updated_user = crud.update_user_password(
+    updated_user = await crud.update_user_password(
         db=db, 
-        user=current_user, 
+        user_id=current_user.id, 
         hashed_password=hashed_password
     )
+    if updated_user is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="사용자를 찾을 수 없습니다.")
     
     return updated_user
 
 # 7. 탈퇴 엔드포인트
 @router.delete("/me", response_model=schemas.User)
-def delete_user_me(
+async def delete_user_me(
     current_user: schemas.User = Depends(auth.get_current_user), # 토큰 검사
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ): 
     # 1. CRUD 함수를 호출하여 DB에서 삭제
-    #    current_user는 auth.get_current_user가 찾아준 db.User 객체입니다.
-    deleted_user = crud.delete_user(db=db, user=current_user)
+    #    current_user는 auth.get_current_user가 찾아준 사용자 정보(schemas.User)입니다.
+    deleted_user = await crud.delete_user(db=db, user_id=current_user.id)
+    if deleted_user is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="사용자를 찾을 수 없습니다.")
     
     # 2. 삭제된 사용자 정보 반환
     return deleted_user
 
 # 8. 즐겨찾기 하기
 @router.post("/me/favorites", response_model=schemas.UserFavorite)
-def create_favorite_for_user(
+async def create_favorite_for_user(
     favorite: schemas.UserFavoriteCreate, # 1. Body로 anime_id, title 등 받기
-    db: Session = Depends(get_db),
-    current_user: User = Depends(auth.get_current_user) # 2. 토큰으로 "나" 확인
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.User = Depends(auth.get_current_user) # 2. 토큰으로 "나" 확인
 ):
-    # 3. 중복 체크
-    db_favorite = crud.get_favorite_by_anime_id(
-        db, user_id=current_user.id, anime_id=favorite.anime_id
+    # 3. CRUD를 통해 DB에 생성 (이미 찜한 애니면 None)
+    db_favorite = await crud.create_user_favorite(
+        db=db, favorite=favorite, user_id=current_user.id
     )
-    if db_favorite:
+    if db_favorite is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, 
             detail="이미 즐겨찾기에 추가된 애니메이션입니다."
         )
-    
-    # 4. CRUD를 통해 DB에 생성
-    return crud.create_user_favorite(
-        db=db, favorite=favorite, user_id=current_user.id
-    )
+    return db_favorite
+
+# 8-1. 즐겨찾기 여러 개 한 번에 추가 (이미 찜한 애니는 건너뛰고, 새로 추가된 것만 반환)
+@router.post("/me/favorites/bulk", response_model=List[schemas.UserFavorite])
+async def create_favorites_for_user(
+    body: schemas.UserFavoriteBulkCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.User = Depends(auth.get_current_user)
+):
+    return await crud.create_user_favorites(db, favorites=body.favorites, user_id=current_user.id)
 
 # 9. 즐겨찾기 목록 조회 엔드포인트
+#    limit을 주면 커서 페이지네이션: 다음 페이지가 있으면 X-Next-Cursor 헤더 값을 cursor로 다시 요청
+#    (limit이 없으면 예전처럼 전체 목록)
 @router.get("/me/favorites", response_model=List[schemas.UserFavorite])
-def read_user_favorites(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(auth.get_current_user) # 1. 토큰으로 "나" 확인
+async def read_user_favorites(
+    response: Response,
+    limit: int | None = Query(None, ge=1, le=500),
+    cursor: int | None = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.User = Depends(auth.get_current_user) # 1. 토큰으로 "나" 확인
 ):
     # 2. CRUD를 통해 DB에서 "내" 목록 조회
-    return crud.get_user_favorites(db, user_id=current_user.id)
+    if limit is None:
+        return await crud.get_user_favorites(db, user_id=current_user.id)
+
+    favorites, next_cursor = await crud.get_user_favorites_page(
+        db, user_id=current_user.id, limit=limit, after_id=cursor
+    )
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+    return favorites
+
+# 9-1. 즐겨찾기 여러 개 한 번에 삭제 (DELETE /users/me/favorites?anime_ids=1&anime_ids=2, 실제로 삭제된 것만 반환)
+@router.delete("/me/favorites", response_model=List[schemas.UserFavorite])
+async def delete_favorites_for_user(
+    anime_ids: List[int] = Query(..., min_length=1, max_length=500),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.User = Depends(auth.get_current_user)
+):
+    return await crud.delete_user_favorites(db, anime_ids=anime_ids, user_id=current_user.id)
 
 # 10. 즐겨찾기 삭제 엔드포인트
 @router.delete("/me/favorites/{anime_id}", response_model=schemas.UserFavorite)
-def delete_favorite_for_user(
+async def delete_favorite_for_user(
     anime_id: int, # 1. URL 경로에서 anime_id 받기
-    db: Session = Depends(get_db),
-    current_user: User = Depends(auth.get_current_user) # 2. 토큰으로 "나" 확인
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.User = Depends(auth.get_current_user) # 2. 토큰으로 "나" 확인
 ):
     # 3. 삭제할 항목이 DB에 있는지 (내 것이 맞는지) 확인
-    db_favorite = crud.get_favorite_by_anime_id(
+    db_favorite = await crud.get_favorite_by_anime_id(
         db, user_id=current_user.id, anime_id=anime_id
     )
     if db_favorite is None:
@@ -163,4 +206,24 @@ def delete_favorite_for_user(
         )
         
     # 4. CRUD를 통해 DB에서 삭제
-    return crud.delete_user_favorite(db, db_favorite=db_favorite)
\ No newline at end of file
+    return await crud.delete_user_favorite(db, db_favorite=db_favorite)
+
+# 11. 즐겨찾기 기반 맞춤 추천 엔드포인트
+@router.get("/me/recommendations")
+async def read_recommendations_for_user(
+    top_n: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.User = Depends(auth.get_current_user), # 1. 토큰으로 "나" 확인
+    recommender: RecommenderService = Depends(get_recommender_service)
+):
+    # 2. "내" 즐겨찾기 버전(개수, 최대 id)으로 캐시 확인 (목록 전체를 읽지 않음)
+    version = await crud.get_user_favorites_version(db, user_id=current_user.id)
+    cached = recommender.get_cached_user_recommendations(current_user.id, version, top_n)
+    if cached is not MISSING:
+        return cached
+
+    # 3. 캐시에 없으면 anime_id만 읽어서, 즐겨찾기 전체를 합친 프로필로 추천 (행렬 연산은 스레드에서 실행)
+    anime_ids = await crud.get_user_favorite_anime_ids(db, user_id=current_user.id)
+    return await asyncio.to_thread(
+        recommender.get_user_recommendations, current_user.id, version, anime_ids, top_n
+    )